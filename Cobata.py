@@ -2,6 +2,8 @@ import streamlit as st
 import json
 import os
 import importlib
+import agendador
+import esquemas
 from flask import Flask, jsonify, request
 
 st.set_page_config(page_title="COBATA", page_icon="::", layout="wide", initial_sidebar_state="auto",)
@@ -334,8 +336,14 @@ def main():
 
     # Controle de navegação
     if st.session_state.logged_in:
+        # Inicia a pré-carga das tabelas mais acessadas (uma vez por processo)
+        agendador.iniciar()
+
         # Renderiza a barra de navegação estilizada
         navigation_bar(st.session_state.page)
+        agendador.exibir_status()
+        with st.sidebar.expander("Compactação dos dados em cache"):
+            st.dataframe(esquemas.relatorio(), hide_index=True)
         load_page(st.session_state.page)
     else:
         # Exibe a página de login ou registro
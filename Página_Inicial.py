@@ -1,28 +1,37 @@
 import os
+import threading
+import time
 import streamlit as st
 import pandas as pd
-from supabase import create_client, Client
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.express as px
-from cachetools import TTLCache
-
-# Configuração do cache (TTL de 300 segundos)
-cache = TTLCache(maxsize=1, ttl=300)
-
-# Configuração do cliente Supabase (usar variáveis de ambiente)
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-# Validar URL e chave
-if not SUPABASE_URL or not SUPABASE_KEY:
-    st.error("Erro: SUPABASE_URL ou SUPABASE_KEY não estão definidos nas variáveis de ambiente.")
-    st.stop()
-
-# Inicializar cliente Supabase
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    st.error(f"Erro ao inicializar o cliente Supabase: {e}")
-    st.stop()
+import dados
+import gerenciador_cache
+import armazenamento
+import esquemas
+import janelas
+import serie_diaria
+
+# Consulta de pedidos: só as colunas lidas pelo dashboard e as filiais exibidas
+CONSULTA_PCPEDC = {
+    "table": "PCPEDC",
+    "columns": ['id', 'NUMPED', 'DATA_PEDIDO', 'QT', 'PVENDA', 'CODFILIAL'],
+    "filters": [('CODFILIAL', 'in', ['1', '2'])],
+    "date_column": "DATA_PEDIDO",
+    "particao_filial": "CODFILIAL",
+    "order": "id",
+    "marca": "id",
+    "chave_negocio": ['NUMPED', 'CODPROD'],
+}
+
+# Validade (segundos) de uma busca de produto sem resultado
+TTL_BUSCA_VAZIA = 30
+
+# Filiais acompanhadas pela série diária (as caixas de seleção escolhem colunas da série)
+FILIAIS = ['1', '2']
+
+# Segundos entre atualizações da série diária (só os dias recentes são buscados de novo)
+TTL_SERIE = 300
 
 # CSS para quebra de linha no st.dataframe
 st.markdown("""
@@ -38,24 +47,23 @@ st.markdown("""
 # Função para buscar produtos
 def buscar_produto(codigoproduto=None, nomeproduto=None):
     cache_key = f"PCPRODUT_{codigoproduto}_{nomeproduto}"
-    if cache_key in cache:
-        return cache[cache_key]
+    df = gerenciador_cache.obter("produtos", cache_key)
+    if df is not None:
+        return df
 
     try:
-        query = supabase.table("PCPRODUT").select("CODPROD, DESCRICAO, CODAUXILIAR, QTUNITCX")
-        
+        filtros = []
         if codigoproduto and nomeproduto:
-            query = query.or_(f"CODPROD.eq.{codigoproduto},DESCRICAO.ilike.%{nomeproduto}%")
+            filtros.append((None, "or", f"CODPROD.eq.{codigoproduto},DESCRICAO.ilike.%{nomeproduto}%"))
         elif codigoproduto:
-            query = query.eq("CODPROD", codigoproduto)
+            filtros.append(("CODPROD", "eq", codigoproduto))
         elif nomeproduto:
-            query = query.ilike("DESCRICAO", f"%{nomeproduto}%")
+            filtros.append(("DESCRICAO", "ilike", f"%{nomeproduto}%"))
 
-        response = query.execute()
-        data = response.data
+        data = dados.fetch("PCPRODUT", "CODPROD, DESCRICAO, CODAUXILIAR, QTUNITCX", filters=filtros)
 
         if data:
-            df = pd.DataFrame(data)
+            df = esquemas.aplicar("PCPRODUT", pd.DataFrame(data))
             df['DESCRICAO'] = df['DESCRICAO'].apply(lambda x: ''.join(c + '\u200B' for c in str(x)))
             df = df.rename(columns={
                 "CODPROD": "CODIGOPRODUTO",
@@ -63,101 +71,93 @@ def buscar_produto(codigoproduto=None, nomeproduto=None):
                 "CODAUXILIAR": "CODBARRA",
                 "QTUNITCX": "QTCAIXA"
             })
-            cache[cache_key] = df
+            gerenciador_cache.gravar("produtos", cache_key, df)
         else:
             st.warning("Nenhum produto encontrado.")
-            cache[cache_key] = pd.DataFrame()
             df = pd.DataFrame()
+            # Busca sem resultado expira antes (o produto pode ser cadastrado em seguida)
+            gerenciador_cache.gravar("produtos", cache_key, df, ttl=TTL_BUSCA_VAZIA)
 
     except Exception as e:
         st.error(f"Erro ao buscar produtos do Supabase: {e}")
-        cache[cache_key] = pd.DataFrame()
         df = pd.DataFrame()
+        gerenciador_cache.gravar("produtos", cache_key, df, ttl=TTL_BUSCA_VAZIA)
 
-    return cache[cache_key]
+    return df
 
 # Função para carregar dados de pedidos
-@st.cache_data(show_spinner=False, ttl=300)
+@gerenciador_cache.em_cache("pagina_inicial")
 def carregar_dados():
-    cache_key = "PCPEDC_data"
-    if cache_key in cache:
-        return cache[cache_key]
-
     try:
-        all_data = []
-        offset = 0
-        limit = 1000
-
-        required_columns = ['id', 'CODPROD', 'QT', 'NUMPED', 'DATA_PEDIDO', 'PVENDA', 'CONDVENDA', 
-                           'CODUSUR', 'CODUSUR_N', 'CODFILIAL', 'CODPRACA', 'CODCLI', 'NOME_EMIT', 'DEVOLUCAO']
-
-        while True:
-            response = supabase.table("PCPEDC").select("*").range(offset, offset + limit - 1).execute()
-            data = response.data
-            if not data:
-                break
-            all_data.extend(data)
-            offset += limit
-
-        if all_data:
-            df = pd.DataFrame(all_data)
-            missing_columns = [col for col in required_columns if col not in df.columns]
+        # Histórico completo: meses fechados do Parquet local (por filial), mês aberto do Supabase
+        df = armazenamento.carregar(CONSULTA_PCPEDC)
+
+        if not df.empty:
+            missing_columns = dados.verificar_colunas(CONSULTA_PCPEDC, df)
             if missing_columns:
                 st.error(f"Colunas ausentes nos dados retornados pela API: {missing_columns}")
-                cache[cache_key] = pd.DataFrame()
                 return pd.DataFrame()
 
-            df['DATA_PEDIDO'] = pd.to_datetime(df['DATA_PEDIDO'], errors='coerce')
-            df = df.dropna(subset=['DATA_PEDIDO'])
-
-            for col in ['QT', 'PVENDA', 'CODUSUR_N']:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
+            # Tipos do esquema PCPEDC (data ISO, QT e PVENDA numéricos sem nulos)
+            df = esquemas.aplicar("PCPEDC", df)
             df['VLTOTAL'] = df['PVENDA'] * df['QT']
-            df['VLTOTAL'] = df['VLTOTAL'].fillna(0)
-
-            df = df[df['CODFILIAL'].isin(['1', '2'])]
-            cache[cache_key] = df
+            df = janelas.ordenar(df, 'DATA_PEDIDO')
         else:
             st.warning("Nenhum dado retornado pelo Supabase.")
-            cache[cache_key] = pd.DataFrame()
             df = pd.DataFrame()
 
     except Exception as e:
         st.error(f"Erro ao buscar dados do Supabase: {e}")
         st.write(f"Detalhes do erro: {str(e)}")
-        cache[cache_key] = pd.DataFrame()
         df = pd.DataFrame()
 
-    return cache[cache_key]
+    return df
 
 # Função para formatar valores monetários
 def formatar_valor(valor):
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-# Funções de cálculo
-def calcular_faturamento(data, hoje, ontem, semana_inicial, semana_passada_inicial):
-    faturamento_hoje = data[data['DATA_PEDIDO'].dt.date == hoje.date()]['VLTOTAL'].sum()
-    faturamento_ontem = data[data['DATA_PEDIDO'].dt.date == ontem.date()]['VLTOTAL'].sum()
-    faturamento_semanal_atual = data[(data['DATA_PEDIDO'].dt.date >= semana_inicial.date()) & (data['DATA_PEDIDO'].dt.date <= hoje.date())]['VLTOTAL'].sum()
-    faturamento_semanal_passada = data[(data['DATA_PEDIDO'].dt.date >= semana_passada_inicial.date()) & (data['DATA_PEDIDO'].dt.date < semana_inicial.date())]['VLTOTAL'].sum()
-    return faturamento_hoje, faturamento_ontem, faturamento_semanal_atual, faturamento_semanal_passada
-
-def calcular_quantidade_pedidos(data, hoje, ontem, semana_inicial, semana_passada_inicial):
-    pedidos_hoje = data[data['DATA_PEDIDO'].dt.date == hoje.date()]['NUMPED'].nunique()
-    pedidos_ontem = data[data['DATA_PEDIDO'].dt.date == ontem.date()]['NUMPED'].nunique()
-    pedidos_semanal_atual = data[(data['DATA_PEDIDO'].dt.date >= semana_inicial.date()) & (data['DATA_PEDIDO'].dt.date <= hoje.date())]['NUMPED'].nunique()
-    pedidos_semanal_passada = data[(data['DATA_PEDIDO'].dt.date >= semana_passada_inicial.date()) & (data['DATA_PEDIDO'].dt.date < semana_inicial.date())]['NUMPED'].nunique()
-    return pedidos_hoje, pedidos_ontem, pedidos_semanal_atual, pedidos_semanal_passada
-
-def calcular_comparativos(data, hoje, mes_atual, ano_atual):
-    mes_anterior = mes_atual - 1 if mes_atual > 1 else 12
-    ano_anterior = ano_atual if mes_atual > 1 else ano_atual - 1
-    faturamento_mes_atual = data[(data['DATA_PEDIDO'].dt.month == mes_atual) & (data['DATA_PEDIDO'].dt.year == ano_atual)]['VLTOTAL'].sum()
-    pedidos_mes_atual = data[(data['DATA_PEDIDO'].dt.month == mes_atual) & (data['DATA_PEDIDO'].dt.year == ano_atual)]['NUMPED'].nunique()
-    faturamento_mes_anterior = data[(data['DATA_PEDIDO'].dt.month == mes_anterior) & (data['DATA_PEDIDO'].dt.year == ano_anterior)]['VLTOTAL'].sum()
-    pedidos_mes_anterior = data[(data['DATA_PEDIDO'].dt.month == mes_anterior) & (data['DATA_PEDIDO'].dt.year == ano_anterior)]['NUMPED'].nunique()
-    return faturamento_mes_atual, faturamento_mes_anterior, pedidos_mes_atual, pedidos_mes_anterior
+# Função para calcular o faturamento, pedidos e linhas por dia e filial a partir de `desde`
+# (usada quando a função kpi_pcpedc_diario não está instalada no banco)
+def calcular_diario_local(desde):
+    data = carregar_dados()
+    if data.empty:
+        return pd.DataFrame()
+    if desde is not None:
+        data = janelas.fatiar(data, 'DATA_PEDIDO', desde, data['DATA_PEDIDO'].iloc[-1])
+    return serie_diaria.agregar(data)
+
+# Função para buscar o faturamento diário por filial calculado no banco (sql/kpis_pagina_inicial.sql)
+def carregar_diario(desde):
+    try:
+        params = {"p_filiais": FILIAIS, "p_desde": desde.isoformat() if desde else None}
+        diario = pd.DataFrame(dados.rpc("kpi_pcpedc_diario", params, order=["DATA_PEDIDO", "CODFILIAL"]))
+    except Exception as e:
+        if not dados.funcao_ausente(e):
+            raise
+        # Função ainda não instalada no banco: agrega a tabela completa em pandas
+        return calcular_diario_local(desde)
+    return esquemas.aplicar("kpi_pcpedc_diario", diario)
+
+# Série diária com somas acumuladas por filial (compartilhada por todas as sessões do processo)
+@st.cache_resource(show_spinner=False)
+def _serie():
+    return serie_diaria.SerieDiaria()
+
+_trava_serie = threading.Lock()
+
+# Função para obter a série diária atualizada: a primeira carga traz todos os dias e as seguintes
+# (a cada TTL_SERIE) só os dias a partir da carência, refazendo os acumulados desses dias
+def obter_serie():
+    serie = _serie()
+    with _trava_serie:
+        if serie.atualizado_em is None or time.monotonic() - serie.atualizado_em > TTL_SERIE:
+            try:
+                serie.atualizar(carregar_diario(serie.desde()))
+            except Exception as e:
+                # A série segue com os dias já carregados e a próxima execução tenta de novo
+                st.error(f"Erro ao buscar o faturamento diário do Supabase: {e}")
+    return serie
 
 def main():
     st.markdown("""
@@ -222,39 +222,34 @@ def main():
     st.markdown("---")
     st.markdown("### Resumo de Vendas")
 
-    with st.spinner("Carregando dados..."):
-        data = carregar_dados()
-    
-    if not data.empty:
-        col1, col2 = st.columns(2)
-        with col1:
-            filial_1 = st.checkbox("Filial 1", value=True)
-        with col2:
-            filial_2 = st.checkbox("Filial 2", value=True)
-
-        filiais_selecionadas = []
-        if filial_1:
-            filiais_selecionadas.append('1')
-        if filial_2:
-            filiais_selecionadas.append('2')
-
-        if not filiais_selecionadas:
-            st.warning("Por favor, selecione pelo menos uma filial para exibir os dados.")
-            return
+    col1, col2 = st.columns(2)
+    with col1:
+        filial_1 = st.checkbox("Filial 1", value=True)
+    with col2:
+        filial_2 = st.checkbox("Filial 2", value=True)
 
-        data_filtrada = data[data['CODFILIAL'].isin(filiais_selecionadas)]
+    filiais_selecionadas = []
+    if filial_1:
+        filiais_selecionadas.append('1')
+    if filial_2:
+        filiais_selecionadas.append('2')
 
-        hoje = datetime.now()
-        ontem = hoje - timedelta(days=1)
-        semana_inicial = hoje - timedelta(days=hoje.weekday())
-        semana_passada_inicial = semana_inicial - timedelta(days=7)
+    if not filiais_selecionadas:
+        st.warning("Por favor, selecione pelo menos uma filial para exibir os dados.")
+        return
 
-        faturamento_hoje, faturamento_ontem, faturamento_semanal_atual, faturamento_semanal_passada = calcular_faturamento(data_filtrada, hoje, ontem, semana_inicial, semana_passada_inicial)
-        pedidos_hoje, pedidos_ontem, pedidos_semanal_atual, pedidos_semanal_passada = calcular_quantidade_pedidos(data_filtrada, hoje, ontem, semana_inicial, semana_passada_inicial)
-
-        mes_atual = hoje.month
-        ano_atual = hoje.year
-        faturamento_mes_atual, faturamento_mes_anterior, pedidos_mes_atual, pedidos_mes_anterior = calcular_comparativos(data_filtrada, hoje, mes_atual, ano_atual)
+    hoje = datetime.now()
+    with st.spinner("Carregando dados..."):
+        serie = obter_serie()
+    resumo = serie_diaria.resumo(serie, filiais_selecionadas, hoje.date())
+    
+    if serie.inicio is not None:
+        faturamento_hoje, pedidos_hoje = resumo.get('hoje', (0, 0))
+        faturamento_ontem, pedidos_ontem = resumo.get('ontem', (0, 0))
+        faturamento_semanal_atual, pedidos_semanal_atual = resumo.get('semana_atual', (0, 0))
+        faturamento_semanal_passada, pedidos_semanal_passada = resumo.get('semana_passada', (0, 0))
+        faturamento_mes_atual, pedidos_mes_atual = resumo.get('mes_atual', (0, 0))
+        faturamento_mes_anterior, pedidos_mes_anterior = resumo.get('mes_anterior', (0, 0))
 
         col1, col2, col3, col4, col5 = st.columns(5)
 
@@ -385,8 +380,8 @@ def main():
         st.subheader("Comparação de Vendas por Mês e Ano")
 
         col_data1, col_data2 = st.columns(2)
-        min_date = data_filtrada['DATA_PEDIDO'].min() if not data_filtrada.empty else pd.to_datetime("2024-01-01")
-        max_date = data_filtrada['DATA_PEDIDO'].max() if not data_filtrada.empty else pd.to_datetime("2025-05-13")
+        min_date = serie.inicio
+        max_date = serie.fim
         with col_data1:
             data_inicial = st.date_input("Data Inicial", value=pd.to_datetime("2024-04-08"), min_value=min_date, max_value=max_date)
         with col_data2:
@@ -396,16 +391,12 @@ def main():
             st.error("A data inicial não pode ser maior que a data final.")
             return
 
-        df_periodo = data_filtrada[(data_filtrada['DATA_PEDIDO'].dt.date >= data_inicial) & 
-                                   (data_filtrada['DATA_PEDIDO'].dt.date <= data_final)].copy()
-
-        if not df_periodo.empty:
-            df_periodo['Ano'] = df_periodo['DATA_PEDIDO'].dt.year
-            df_periodo['Mês'] = df_periodo['DATA_PEDIDO'].dt.month
+        # Um par de acumulados por mês do período (meses sem pedidos ficam fora do gráfico)
+        vendas_por_mes_ano = serie.mensal(filiais_selecionadas, data_inicial, data_final).rename(
+            columns={'VLTOTAL': 'Valor_Total_Vendido'}
+        )
 
-            vendas_por_mes_ano = df_periodo.groupby(['Ano', 'Mês']).agg(
-                Valor_Total_Vendido=('VLTOTAL', 'sum')
-            ).reset_index()
+        if not vendas_por_mes_ano.empty:
 
             fig = px.line(vendas_por_mes_ano, x='Mês', y='Valor_Total_Vendido', color='Ano',
                           title=f'Vendas por Mês ({data_inicial} a {data_final})',
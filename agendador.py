@@ -0,0 +1,100 @@
+import importlib
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import streamlit as st
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+logger = logging.getLogger(__name__)
+
+
+# Funções de pré-carga: importam a página só na hora (evita import circular com o Cobata)
+# e recarregam a mesma chave que a página usa no gerenciador de cache
+def _separacao():
+    return importlib.import_module("Pedidos").get_data_from_supabase.recarregar()
+
+
+def _pedidos_venda():
+    hoje = date.today()
+    return importlib.import_module("Pedidos_Venda").fetch_pedidos.recarregar(hoje, hoje)
+
+
+def _estoque():
+    estoque = importlib.import_module("Estoque")
+    return estoque.fetch_supabase_data.recarregar(estoque.SUPABASE_CONFIG["estoque"])
+
+
+# Tarefas de pré-carga das tabelas mais acessadas: intervalo e jitter em segundos
+TAREFAS = {
+    "separacao": {"descricao": "PCPEDC_POSICAO / PCMOVENDPEND", "funcao": _separacao, "intervalo": 30, "jitter": 5},
+    "pedidos_venda": {"descricao": "PCPEDI (dia atual)", "funcao": _pedidos_venda, "intervalo": 60, "jitter": 10},
+    "estoque": {"descricao": "ESTOQUE", "funcao": _estoque, "intervalo": 300, "jitter": 30},
+}
+
+
+# Situação de cada tarefa (compartilhada por todas as sessões do processo)
+@st.cache_resource(show_spinner=False)
+def _situacao() -> dict:
+    return {nome: {"execucoes": 0, "ultima": None, "duracao": None, "resultado": None} for nome in TAREFAS}
+
+
+_trava_situacao = threading.Lock()
+
+
+# Função que executa uma tarefa e registra horário, duração e resultado
+def _executar(nome: str):
+    inicio = time.perf_counter()
+    try:
+        recarregou = TAREFAS[nome]["funcao"]()
+        resultado = "ok" if recarregou else "ignorada (atualização em andamento)"
+    except Exception as e:
+        logger.exception("Erro na pré-carga %s", nome)
+        resultado = f"erro: {e}"
+    with _trava_situacao:
+        situacao = _situacao()[nome]
+        situacao["execucoes"] += 1
+        situacao["ultima"] = datetime.now()
+        situacao["duracao"] = time.perf_counter() - inicio
+        situacao["resultado"] = resultado
+
+
+# Função para iniciar o agendador uma única vez por processo. Cada tarefa tem no máximo uma execução
+# por vez (max_instances=1) e execuções atrasadas são juntadas numa só (coalesce).
+@st.cache_resource(show_spinner=False)
+def iniciar() -> BackgroundScheduler:
+    agendador = BackgroundScheduler(daemon=True)
+    for nome, tarefa in TAREFAS.items():
+        agendador.add_job(
+            _executar,
+            IntervalTrigger(seconds=tarefa["intervalo"], jitter=tarefa.get("jitter")),
+            args=[nome],
+            id=nome,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(),
+        )
+    agendador.start()
+    return agendador
+
+
+# Função para exibir a situação das pré-cargas na barra lateral
+def exibir_status():
+    agendador = iniciar()
+    with _trava_situacao:
+        linhas = []
+        for nome, situacao in _situacao().items():
+            job = agendador.get_job(nome)
+            linhas.append({
+                "Tarefa": TAREFAS[nome]["descricao"],
+                "Última execução": situacao["ultima"].strftime("%H:%M:%S") if situacao["ultima"] else "-",
+                "Duração (s)": round(situacao["duracao"], 2) if situacao["duracao"] is not None else None,
+                "Resultado": situacao["resultado"] or "-",
+                "Execuções": situacao["execucoes"],
+                "Próxima": job.next_run_time.strftime("%H:%M:%S") if job and job.next_run_time else "-",
+            })
+    with st.sidebar.expander("Pré-carga de dados"):
+        st.dataframe(pd.DataFrame(linhas), hide_index=True)
@@ -0,0 +1,159 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import armazenamento
+import esquemas
+import gerenciador_cache
+import particoes
+
+# Agregados diários incrementais: uma função de agregação (linhas de um intervalo de dias -> linhas
+# agregadas com a coluna DIA) roda uma vez por dia fechado e o resultado fica guardado por dia no
+# processo, como as partições diárias. Os dias dentro da carência do armazenamento (ainda recebem
+# lançamentos) são reagregados a cada leitura. A função recebe as linhas já com os tipos do esquema
+# e, com um frame vazio, devolve o frame vazio com as colunas do agregado.
+
+# Namespace do gerenciador de cache com os dias agregados ((consulta, função, dia) -> linhas agregadas do
+# dia): o orçamento em bytes limita a memória e os dias menos usados saem primeiro (são reagregados)
+NAMESPACE = "agregados"
+
+
+# Função para obter as travas de preenchimento por consulta e função (compartilhadas pelo processo)
+@st.cache_resource(show_spinner=False)
+def _travas() -> dict:
+    return {}
+
+
+_trava_todos = threading.Lock()
+
+
+def _agregado(spec: dict, agregar) -> tuple:
+    return (spec.get("projeto", "principal"), spec["table"], repr(spec.get("columns", "*")),
+            repr(spec.get("filters", [])), agregar.__module__, agregar.__qualname__)
+
+
+def _trava(agregado: tuple) -> threading.Lock:
+    with _trava_todos:
+        return _travas().setdefault(agregado, threading.Lock())
+
+
+# Função para agregar um intervalo de dias lido do armazenamento (Parquet nos meses fechados)
+def _agregar_intervalo(spec: dict, agregar, primeiro: date, ultimo: date) -> pd.DataFrame:
+    return agregar(esquemas.aplicar(spec["table"], armazenamento.carregar(spec, primeiro, ultimo)))
+
+
+# Função para obter os agregados dos dias fechados pedidos: os que ainda não estão em memória são
+# agregados a partir do armazenamento (lacunas contíguas numa leitura cada) e guardados
+def _dias_fechados(spec: dict, agregar, dias: list[date]) -> list[pd.DataFrame]:
+    agregado = _agregado(spec, agregar)
+    with _trava(agregado):
+        guardados = {dia: gerenciador_cache.obter(NAMESPACE, (agregado, dia)) for dia in dias}
+        faltando = [dia for dia, df in guardados.items() if df is None]
+        for primeiro, ultimo in particoes.lacunas(faltando):
+            linhas = _agregar_intervalo(spec, agregar, primeiro, ultimo)
+            vazio = linhas.iloc[0:0]
+            por_dia = {dia.date(): do_dia for dia, do_dia in linhas.groupby('DIA', observed=True)} if not linhas.empty else {}
+            for n in range((ultimo - primeiro).days + 1):
+                dia = primeiro + timedelta(days=n)
+                guardados[dia] = por_dia.get(dia, vazio).reset_index(drop=True)
+                gerenciador_cache.gravar(NAMESPACE, (agregado, dia), guardados[dia])
+        return [guardados[dia] for dia in dias]
+
+
+def _intervalo(inicio: date, fim: date) -> list[date]:
+    return [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)]
+
+
+def _juntar(partes: list[pd.DataFrame], agregar) -> pd.DataFrame:
+    partes = [parte for parte in partes if not parte.empty]
+    return pd.concat(partes, ignore_index=True) if partes else agregar(pd.DataFrame())
+
+
+# Função para ler o agregado de um intervalo qualquer: dias fechados da memória (agregados na primeira
+# leitura) e dias da carência reagregados
+def carregar(spec: dict, agregar, data_inicial, data_final) -> pd.DataFrame:
+    inicio = armazenamento.para_data(data_inicial)
+    fim = armazenamento.para_data(data_final)
+    if inicio > fim:
+        return agregar(pd.DataFrame())
+
+    limite = date.today() - timedelta(days=armazenamento.DIAS_CARENCIA)
+    partes = _dias_fechados(spec, agregar, _intervalo(inicio, min(fim, limite)))
+
+    # Dias recentes: sempre reagregados (mês aberto pela sincronização incremental)
+    if fim > limite:
+        partes.append(_agregar_intervalo(spec, agregar, max(inicio, limite + timedelta(days=1)), fim))
+    return _juntar(partes, agregar)
+
+
+# Soma móvel de um agregado pelas chaves: o total dos dias fechados da janela é mantido entre leituras
+# (entram os dias novos, saem os que deixaram a janela), então avançar um dia custa dois dias de linhas
+class _Janela:
+    def __init__(self):
+        self.primeiro_dia = None  # primeira data da tabela (janelas sem tamanho)
+        self.inicio = None
+        self.fim = None
+        self.total = None  # DataFrame indexado pelas chaves
+        self.trava = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def _janelas() -> dict:
+    return {}
+
+
+def _janela(spec: dict, agregar, chaves: tuple, dias) -> _Janela:
+    chave = (spec.get("projeto", "principal"), spec["table"], repr(spec.get("columns", "*")),
+             repr(spec.get("filters", [])), agregar.__module__, agregar.__qualname__, chaves, dias)
+    janelas = _janelas()
+    with _trava_todos:
+        if chave not in janelas:
+            janelas[chave] = _Janela()
+        return janelas[chave]
+
+
+def _somar(partes: list[pd.DataFrame], agregar, chaves: list, metricas: list) -> pd.DataFrame:
+    return _juntar(partes, agregar).groupby(chaves, observed=True)[metricas].sum()
+
+
+# Função para descartar as chaves sem linhas na janela (a subtração deixa resíduos de ponto flutuante
+# nas somas, como 2.78e-17, então só a contagem de linhas diz se a chave saiu) e devolver à contagem o
+# tipo inteiro que o alinhamento das somas trocou por float
+def _ajustar(total: pd.DataFrame, contagem: str) -> pd.DataFrame:
+    total = total[total[contagem] > 0]
+    return total.astype({contagem: np.int64})
+
+
+# Função para somar as métricas por chave nos últimos `dias` dias até hoje (ou desde a primeira data da
+# tabela, com dias=None). Os dias da carência não entram no total guardado e são somados a cada leitura.
+# `contagem` é a métrica com o número de linhas agregadas: chaves cujas linhas saem todas da janela são
+# descartadas.
+def somar_janela(spec: dict, agregar, chaves: list, metricas: list, dias: int = None,
+                 contagem: str = 'LINHAS') -> pd.DataFrame:
+    hoje = date.today()
+    limite = hoje - timedelta(days=armazenamento.DIAS_CARENCIA)
+    janela = _janela(spec, agregar, tuple(chaves), dias)
+
+    with janela.trava:
+        if dias is None:
+            if janela.primeiro_dia is None:
+                janela.primeiro_dia = armazenamento.primeira_data(spec) or hoje
+            inicio = janela.primeiro_dia
+        else:
+            inicio = hoje - timedelta(days=dias)
+
+        if janela.total is None or inicio < janela.inicio or inicio > janela.fim:
+            total = _somar(_dias_fechados(spec, agregar, _intervalo(inicio, limite)), agregar, chaves, metricas)
+        else:
+            saindo = _somar(_dias_fechados(spec, agregar, _intervalo(janela.inicio, inicio - timedelta(days=1))),
+                            agregar, chaves, metricas)
+            entrando = _somar(_dias_fechados(spec, agregar, _intervalo(janela.fim + timedelta(days=1), limite)),
+                              agregar, chaves, metricas)
+            total = _ajustar(janela.total.sub(saindo, fill_value=0).add(entrando, fill_value=0), contagem)
+        janela.inicio, janela.fim, janela.total = inicio, max(limite, inicio - timedelta(days=1)), total
+
+    aberto = _somar([carregar(spec, agregar, max(inicio, limite + timedelta(days=1)), hoje)], agregar, chaves, metricas)
+    return _ajustar(total.add(aberto, fill_value=0), contagem).reset_index()
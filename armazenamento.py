@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import dados
+import sincronizacao
+
+# Diretório do armazenamento local em Parquet (uma pasta por projeto e tabela)
+DIRETORIO_PARQUET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_parquet")
+COMPRESSAO = "zstd"
+
+# Dias após o fim do mês em que ele ainda é lido do Supabase (lançamentos atrasados do ERP). Depois disso o
+# mês gravado não é mais conferido com o banco: correções feitas no ERP num mês fechado só aparecem depois
+# de invalidar(spec, mes), que apaga a partição para a próxima leitura baixá-la de novo.
+DIAS_CARENCIA = 3
+
+# Uma trava por diretório de tabela (manifesto e partições dela): tabelas diferentes baixam ao mesmo tempo
+_travas: dict[str, threading.Lock] = {}
+_trava_travas = threading.Lock()
+
+
+# Função para converter datas, datetimes e textos ISO em date
+def para_data(valor) -> Optional[date]:
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return pd.to_datetime(valor).date()
+
+
+# Função para obter o diretório da tabela (consultas com filtros diferentes são guardadas separadas)
+def _diretorio(spec: dict) -> str:
+    nome = spec["table"]
+    if spec.get("filters"):
+        nome += "__" + hashlib.sha1(repr(spec["filters"]).encode()).hexdigest()[:8]
+    return os.path.join(DIRETORIO_PARQUET, spec.get("projeto", "principal"), nome)
+
+
+# Função para obter a trava do diretório da tabela
+def _trava(diretorio: str) -> threading.Lock:
+    with _trava_travas:
+        return _travas.setdefault(diretorio, threading.Lock())
+
+
+# Funções para ler e gravar o manifesto da tabela ({"particoes": {"AAAA-MM": {linhas, colunas, todas, gravado_em}}})
+def _ler_manifesto(diretorio: str) -> dict:
+    caminho = os.path.join(diretorio, "manifesto.json")
+    if not os.path.exists(caminho):
+        return {"particoes": {}}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_manifesto(diretorio: str, manifesto: dict):
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, "manifesto.json")
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+
+# Funções de calendário dos meses (primeiro dia de cada mês do período e último dia do mês)
+def _meses(inicio: date, fim: date) -> list[date]:
+    meses = []
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        meses.append(mes)
+        mes = (mes + timedelta(days=32)).replace(day=1)
+    return meses
+
+
+def _fim_mes(mes: date) -> date:
+    return (mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def _mes_fechado(mes: date, hoje: date) -> bool:
+    return _fim_mes(mes) + timedelta(days=DIAS_CARENCIA) < hoje
+
+
+# Função para verificar se a partição gravada tem todas as colunas pedidas
+def _cobre(entrada: Optional[dict], columns) -> bool:
+    if entrada is None:
+        return False
+    if isinstance(columns, str):
+        return entrada["todas"]
+    return entrada["todas"] or set(columns) <= set(entrada["colunas"])
+
+
+# Função para recortar as linhas entre duas datas pelo dia (AAAA-MM-DD) da coluna de data
+def _recortar(df: pd.DataFrame, coluna_data: str, inicio: date, fim: date) -> pd.DataFrame:
+    if df.empty:
+        return df
+    dia = df[coluna_data].astype(str).str[:10]
+    return df[(dia >= inicio.isoformat()) & (dia <= fim.isoformat())]
+
+
+# Função para gravar um mês como ano=AAAA/mes=MM[/filial=X]/parte.parquet (troca atômica da pasta do mês)
+def _gravar_mes(diretorio: str, mes: date, df: pd.DataFrame, spec: dict) -> dict:
+    pasta = os.path.join(diretorio, f"ano={mes.year}", f"mes={mes.month:02d}")
+    temporaria = pasta + ".tmp"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+
+    coluna_filial = spec.get("particao_filial")
+    if coluna_filial and coluna_filial in df.columns:
+        grupos = [(os.path.join(temporaria, f"filial={filial}"), grupo)
+                  for filial, grupo in df.groupby(df[coluna_filial].astype(str))]
+    else:
+        grupos = [(temporaria, df)] if not df.empty else []
+
+    for destino, grupo in grupos:
+        os.makedirs(destino, exist_ok=True)
+        tabela = pa.Table.from_pandas(grupo, preserve_index=False)
+        pq.write_table(tabela, os.path.join(destino, "parte.parquet"), compression=COMPRESSAO)
+
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.replace(temporaria, pasta)
+    return {
+        "linhas": len(df),
+        "colunas": list(df.columns) if not df.empty else list(spec.get("columns", [])),
+        "todas": isinstance(spec.get("columns", "*"), str),
+        "gravado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# Função para ler um mês gravado, só com as colunas pedidas e (com `filiais`) só as pastas filial=X pedidas
+def _ler_mes(diretorio: str, mes: date, columns, filiais=None) -> pd.DataFrame:
+    pasta = os.path.join(diretorio, f"ano={mes.year}", f"mes={mes.month:02d}")
+    permitidas = None if filiais is None else {f"filial={filial}" for filial in filiais}
+    partes = []
+    for raiz, pastas, arquivos in os.walk(pasta):
+        if permitidas is not None:
+            pastas[:] = [nome for nome in pastas if not nome.startswith("filial=") or nome in permitidas]
+        for arquivo in arquivos:
+            if arquivo.endswith(".parquet"):
+                caminho = os.path.join(raiz, arquivo)
+                colunas = None if isinstance(columns, str) else list(columns)
+                partes.append(pq.read_table(caminho, columns=colunas).to_pandas())
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+# Função para descobrir a primeira data da tabela (consultas sem data inicial)
+def primeira_data(spec: dict) -> Optional[date]:
+    coluna_data = spec["date_column"]
+    _, filtros, _ = dados.compilar(spec)
+    linhas = dados.fetch(spec["table"], coluna_data, filtros, order=coluna_data, range=(0, 0),
+                         projeto=spec.get("projeto", "principal"))
+    if not linhas or linhas[0][coluna_data] is None:
+        return None
+    return para_data(linhas[0][coluna_data])
+
+
+# Função para apagar a partição gravada de um mês (a próxima leitura baixa o mês de novo do Supabase)
+def invalidar(spec: dict, mes) -> None:
+    mes = para_data(mes).replace(day=1)
+    diretorio = _diretorio(spec)
+    with _trava(diretorio):
+        manifesto = _ler_manifesto(diretorio)
+        if manifesto["particoes"].pop(mes.strftime("%Y-%m"), None) is not None:
+            _gravar_manifesto(diretorio, manifesto)
+        shutil.rmtree(os.path.join(diretorio, f"ano={mes.year}", f"mes={mes.month:02d}"), ignore_errors=True)
+
+
+# Função de leitura com histórico local: meses fechados vêm do Parquet (baixados uma única vez),
+# o mês aberto (e os dias de carência) vem do Supabase pela sincronização incremental.
+# A especificação precisa de "date_column"; "particao_filial" grava uma pasta por filial dentro do mês e
+# `filiais` lê só as pastas (e as linhas do período aberto) dessas filiais.
+def carregar(spec: dict, data_inicial=None, data_final=None, filiais=None) -> pd.DataFrame:
+    hoje = date.today()
+    coluna_data = spec["date_column"]
+    columns = dados.colunas(spec)
+    inicio = para_data(data_inicial) or primeira_data(spec)
+    fim = para_data(data_final) or hoje
+    if inicio is None or inicio > fim:
+        return pd.DataFrame()
+
+    diretorio = _diretorio(spec)
+    fechados = [mes for mes in _meses(inicio, fim) if _mes_fechado(mes, hoje)]
+    partes = []
+
+    with _trava(diretorio):
+        manifesto = _ler_manifesto(diretorio)
+        faltando = [mes for mes in fechados if not _cobre(manifesto["particoes"].get(mes.strftime("%Y-%m")), columns)]
+        em_memoria = {}
+        if faltando:
+            baixado = pd.DataFrame(dados.fetch_spec(spec, faltando[0], _fim_mes(faltando[-1])))
+            for mes in faltando:
+                do_mes = _recortar(baixado, coluna_data, mes, _fim_mes(mes))
+                try:
+                    manifesto["particoes"][mes.strftime("%Y-%m")] = _gravar_mes(diretorio, mes, do_mes, spec)
+                except (pa.ArrowException, OSError, TypeError, ValueError):
+                    # Tipos mistos ou disco indisponível: o mês fica só nesta leitura
+                    em_memoria[mes] = do_mes
+            _gravar_manifesto(diretorio, manifesto)
+
+        for mes in fechados:
+            df_mes = em_memoria[mes] if mes in em_memoria else _ler_mes(diretorio, mes, columns, filiais)
+            partes.append(_recortar(df_mes, coluna_data, max(inicio, mes), min(fim, _fim_mes(mes))))
+
+    # Período aberto: direto do Supabase
+    inicio_aberto = _fim_mes(fechados[-1]) + timedelta(days=1) if fechados else inicio
+    if inicio_aberto <= fim:
+        partes.append(sincronizacao.sincronizar(spec, max(inicio, inicio_aberto), fim))
+
+    # Linhas de outras filiais que não vieram de pastas filial=X (meses só em memória e período aberto)
+    coluna_filial = spec.get("particao_filial")
+    if filiais is not None and coluna_filial:
+        partes = [parte[parte[coluna_filial].astype(str).isin([str(f) for f in filiais])] if coluna_filial in parte
+                  else parte for parte in partes]
+    partes = [parte for parte in partes if not parte.empty]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
@@ -0,0 +1,91 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import esquemas
+
+# Dimensão de calendário compartilhada pelas páginas: uma linha por dia, chaveada pelo número do dia
+# (dias desde 1970-01-01), com os atributos de data já calculados. As páginas trocam dt.year,
+# dt.strftime e weekday() linha a linha por uma junção pelo número do dia (np.take), então a
+# formatação de textos acontece uma vez por dia distinto. A dimensão cresce conforme os dias pedidos.
+
+# Rótulos dos meses em português (mesma grafia usada nos gráficos e tabelas)
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Atributos da dimensão:
+#   DATA (meia-noite do dia), DIA_SEMANA (0 = segunda), SEMANA_ISO, INICIO_SEMANA (segunda-feira),
+#   MES_ANO ("AAAA-MM"), ANO, MES (1 a 12) e MES_NOME ("Jan" a "Dez")
+ATRIBUTOS = ['DATA', 'DIA_SEMANA', 'SEMANA_ISO', 'INICIO_SEMANA', 'MES_ANO', 'ANO', 'MES', 'MES_NOME']
+
+# Intervalo inicial da dimensão (ampliado quando aparecem dias fora dele)
+PRIMEIRO_DIA = date(2020, 1, 1)
+ULTIMO_DIA = date(2030, 12, 31)
+
+_EPOCA = np.datetime64('1970-01-01', 'D')
+
+_dimensao: dict = {"frame": None}
+_trava = threading.Lock()
+
+
+# Função para montar a dimensão dos dias [primeiro, ultimo] (números de dia consecutivos)
+def _montar(primeiro: int, ultimo: int) -> pd.DataFrame:
+    datas = pd.DatetimeIndex((_EPOCA + np.arange(primeiro, ultimo + 1)).astype('datetime64[ns]'))
+    dia_semana = datas.weekday.to_numpy()
+    mes = datas.month.to_numpy()
+    return pd.DataFrame({
+        'DATA': datas,
+        'DIA_SEMANA': dia_semana,
+        'SEMANA_ISO': datas.isocalendar().week.to_numpy(dtype=np.int64),
+        'INICIO_SEMANA': datas - pd.to_timedelta(dia_semana, unit='D'),
+        'MES_ANO': pd.array(datas.strftime('%Y-%m'), dtype=esquemas.TEXTO_COMPACTO),
+        'ANO': datas.year.to_numpy(),
+        'MES': mes,
+        'MES_NOME': pd.array(np.array(MESES, dtype=object)[mes - 1], dtype=esquemas.TEXTO_COMPACTO),
+    }, index=pd.RangeIndex(primeiro, ultimo + 1, name='NUMERO_DIA'))
+
+
+# Função para obter a dimensão cobrindo os dias [primeiro, ultimo] (números de dia)
+def dimensao(primeiro: int = None, ultimo: int = None) -> pd.DataFrame:
+    padrao_primeiro = int((np.datetime64(PRIMEIRO_DIA, 'D') - _EPOCA).astype(int))
+    padrao_ultimo = int((np.datetime64(ULTIMO_DIA, 'D') - _EPOCA).astype(int))
+    primeiro = padrao_primeiro if primeiro is None else min(primeiro, padrao_primeiro)
+    ultimo = padrao_ultimo if ultimo is None else max(ultimo, padrao_ultimo)
+    with _trava:
+        frame = _dimensao["frame"]
+        if frame is None or primeiro < frame.index[0] or ultimo > frame.index[-1]:
+            if frame is not None:
+                primeiro, ultimo = min(primeiro, frame.index[0]), max(ultimo, frame.index[-1])
+            _dimensao["frame"] = frame = _montar(primeiro, ultimo)
+        return frame
+
+
+# Número de dia das datas nulas
+SEM_DIA = np.iinfo(np.int64).min
+
+
+# Função para converter datas (com ou sem fuso, na hora local da coluna) em números de dia; NaT vira SEM_DIA
+def numero_dia(datas: pd.Series) -> np.ndarray:
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    dias = datas.to_numpy(dtype='datetime64[D]')
+    return np.where(np.isnat(dias), SEM_DIA, (dias - _EPOCA).astype(np.int64))
+
+
+# Função para juntar atributos do calendário a uma coluna de datas pelo número do dia: devolve um frame
+# alinhado ao índice das datas só com as colunas pedidas (datas nulas ficam com atributos nulos)
+def atributos(datas: pd.Series, colunas=None) -> pd.DataFrame:
+    colunas = list(colunas or ATRIBUTOS)
+    numeros = numero_dia(datas)
+    validos = numeros != SEM_DIA
+    if not validos.any():
+        return dimensao().iloc[0:0][colunas].reindex(datas.index)
+
+    frame = dimensao(int(numeros[validos].min()), int(numeros[validos].max()))
+    posicoes = np.where(validos, numeros - frame.index[0], 0)
+    resultado = frame[colunas].take(posicoes)
+    resultado.index = datas.index
+    if not validos.all():
+        resultado = resultado.where(pd.Series(validos, index=datas.index), axis=0)
+    return resultado
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+import agregados
+import calendario
+import fornecedores
+
+# Cubo de vendas de PCVENDEDOR no grão (dia, filial, vendedor, fornecedor): relatórios de meses ou anos
+# leem milhares de linhas do cubo em vez de milhões de linhas de pedido. O cubo é um agregado diário
+# incremental (agregados): cada dia fechado é agregado uma vez por processo. Pedidos contados em
+# fornecedores diferentes não podem ser somados entre fornecedores, então cada (dia, filial, vendedor)
+# tem também uma linha de total com FORNECEDOR nulo. Do mesmo modo, um cliente pode comprar em duas
+# filiais no mesmo dia e a positivação não é somável entre filiais: cada (dia, vendedor, fornecedor) tem
+# também uma linha de todas as filiais com CODFILIAL nulo.
+#
+# Os dias são agregados em blocos separados (dias fechados que faltam, carência), então remover duplicatas
+# e achar pedidos bonificados só olha as linhas do bloco. Isso equivale a olhar o período inteiro porque no
+# ERP data, filial, vendedor, rota e cliente são do pedido (iguais em todas as suas linhas): todas as linhas
+# de um pedido caem no mesmo dia, e as contagens distintas por dia e filial são somáveis entre eles.
+
+# Grão do cubo (CODFILIAL nulo = todas as filiais, FORNECEDOR nulo = todos os fornecedores)
+CHAVES = ['DIA', 'CODFILIAL', 'CODUSUR', 'VENDEDOR', 'FORNECEDOR']
+
+# Filial das linhas sem CODFILIAL (coluna opcional na consulta: tabelas sem ela ficam com uma filial só)
+SEM_FILIAL = '-'
+
+# Métricas somáveis entre dias e filiais:
+#   VENDA, CUSTO e QUANTIDADE: linhas de pedidos sem bonificação (mesma regra do resumo antigo da positivação)
+#   PEDIDOS, PEDIDOS_BONIFICADOS, PEDIDOS_DENTRO_ROTA e PEDIDOS_FORA_ROTA: pedidos distintos
+#   POSITIVACOES: clientes distintos dos fornecedores acompanhados (zero nas linhas de total)
+SOMAS = ['VENDA', 'CUSTO', 'QUANTIDADE']
+CONTAGENS = ['PEDIDOS', 'PEDIDOS_BONIFICADOS', 'PEDIDOS_DENTRO_ROTA', 'PEDIDOS_FORA_ROTA', 'POSITIVACOES']
+METRICAS = SOMAS + CONTAGENS
+
+# Dia da semana de cada rota (ROTA em maiúsculas, com e sem acento)
+DIAS_SEMANA_ROTA = {
+    "SEGUNDA": 0, "TERCA": 1, "TERÇA": 1, "QUARTA": 2, "QUINTA": 3,
+    "SEXTA": 4, "SABADO": 5, "SÁBADO": 5, "DOMINGO": 6
+}
+
+
+# Função vetorizada para verificar se cada pedido está dentro da rota: as rotas viram categorias,
+# cada categoria é normalizada e mapeada para o dia da semana uma única vez (-1 = sem rota válida)
+# e a comparação com o dia da semana do pedido é feita de uma vez sobre os arrays
+def dentro_da_rota(datas: pd.Series, rotas: pd.Series) -> pd.Series:
+    rotas = rotas.astype("category")
+    dias_categoria = np.array(
+        [DIAS_SEMANA_ROTA.get(rota.upper(), -1) if isinstance(rota, str) else -1 for rota in rotas.cat.categories] + [-1]
+    )
+    dia_rota = dias_categoria[rotas.cat.codes.to_numpy()]  # código -1 (nulo) cai no último item
+    dia_semana = calendario.atributos(datas, ['DIA_SEMANA'])['DIA_SEMANA'].to_numpy()
+    return pd.Series(dia_rota == dia_semana, index=datas.index)
+
+
+# Função de agregação das linhas de PCVENDEDOR de um intervalo de dias no grão do cubo: remove
+# duplicatas, resolve os fornecedores e conta pedidos e clientes distintos por linha do cubo
+def agregar(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=CHAVES + METRICAS)
+    df = fornecedores.resolver(df.drop_duplicates(subset=['PEDIDO', 'CODPRODUTO']))
+
+    # Pedidos com alguma linha bonificada (em qualquer vendedor) saem das somas
+    bonificada = df['CODIGOVENDA'] != 1
+    pedido_bonificado = df['PEDIDO'].isin(df.loc[bonificada, 'PEDIDO'].dropna().unique())
+    quantidade = df['QUANTIDADE'].where(~pedido_bonificado, 0)
+    dentro = dentro_da_rota(df['DATAPEDIDO'], df['ROTA'])
+    codigo_fornecedor = df['FORNECEDOR'].cat.codes
+    monitorada = (df['CODFORNECEDOR'].isin(fornecedores.CODIGOS) & (codigo_fornecedor >= 0)
+                  & (codigo_fornecedor < len(fornecedores.ORDEM)))
+
+    # Filial do pedido (SEM_FILIAL quando a tabela não tem CODFILIAL)
+    filial = df['CODFILIAL'].astype(object).fillna(SEM_FILIAL).astype(str) if 'CODFILIAL' in df.columns else SEM_FILIAL
+
+    linhas = pd.DataFrame({
+        'DIA': df['DATAPEDIDO'].dt.normalize(),
+        'CODFILIAL': filial,
+        'CODUSUR': df['CODUSUR'],
+        'VENDEDOR': df['VENDEDOR'],
+        'FORNECEDOR': df['FORNECEDOR'].astype(object),
+        'VENDA': df['VALOR'] * quantidade,
+        'CUSTO': df['CUSTOPRODUTO'] * quantidade,
+        'QUANTIDADE': quantidade,
+        'PEDIDOS': df['PEDIDO'],
+        'PEDIDOS_BONIFICADOS': df['PEDIDO'].where(bonificada),
+        'PEDIDOS_DENTRO_ROTA': df['PEDIDO'].where(dentro),
+        'PEDIDOS_FORA_ROTA': df['PEDIDO'].where(~dentro),
+        'POSITIVACOES': df['CODCLIENTE'].where(monitorada),
+    })
+    linhas = linhas[linhas['CODUSUR'].notna() & linhas['VENDEDOR'].notna()]
+
+    # Uma agregação por combinação de filial e fornecedor (a chave que fica de fora vale nulo)
+    agregacoes = {**dict.fromkeys(SOMAS, 'sum'), **dict.fromkeys(CONTAGENS, 'nunique')}
+    partes = []
+    for fora in ([], ['CODFILIAL'], ['FORNECEDOR'], ['CODFILIAL', 'FORNECEDOR']):
+        chaves = [chave for chave in CHAVES if chave not in fora]
+        parte = linhas.groupby(chaves, sort=False, observed=True).agg(agregacoes).reset_index()
+        partes.append(parte.reindex(columns=CHAVES + METRICAS))
+    cubo = pd.concat(partes, ignore_index=True)
+    cubo.loc[cubo['FORNECEDOR'].isna(), 'POSITIVACOES'] = 0
+    return cubo.astype({coluna: np.int64 for coluna in CONTAGENS})
+
+
+# Função para ler o cubo de um intervalo qualquer (dias fechados agregados uma vez, carência reagregada)
+def carregar(spec: dict, data_inicial, data_final) -> pd.DataFrame:
+    return agregados.carregar(spec, agregar, data_inicial, data_final)
+
+
+# Resumo da positivação por vendedor lido do cubo (o relatório resumido da página): data do primeiro dia
+# com pedido, pedidos dentro/fora da rota, bonificados, totais, markup, margem e a matriz de positivação
+# por fornecedor, ordenado por CODUSUR e VENDEDOR. Com `filial`, só os pedidos dessa filial; sem ela, as
+# linhas de todas as filiais.
+def resumo_vendedores(cubo: pd.DataFrame, filial=None) -> pd.DataFrame:
+    cubo = cubo[cubo['CODFILIAL'].isna()] if filial is None else cubo[cubo['CODFILIAL'] == str(filial)]
+    if cubo.empty:
+        return pd.DataFrame()
+    total = cubo[cubo['FORNECEDOR'].isna()]
+    resultado = total.groupby(['CODUSUR', 'VENDEDOR'], observed=True).agg(
+        DATAPEDIDO=('DIA', 'min'),
+        PEDIDOS_DENTRO_ROTA=('PEDIDOS_DENTRO_ROTA', 'sum'),
+        PEDIDOS_FORA_ROTA=('PEDIDOS_FORA_ROTA', 'sum'),
+        PEDIDOS_COM_BONIFICACAO=('PEDIDOS_BONIFICADOS', 'sum'),
+        TOTAL_VENDIDO=('VENDA', 'sum'),
+        TOTAL_CUSTO=('CUSTO', 'sum'),
+    )
+    resultado.insert(3, 'TOTAL', resultado['PEDIDOS_DENTRO_ROTA'] + resultado['PEDIDOS_FORA_ROTA'])
+    venda, custo = resultado['TOTAL_VENDIDO'].to_numpy(), resultado['TOTAL_CUSTO'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        markup = np.round((venda - custo) / custo * 100, 2)
+        margem = np.round((venda - custo) / venda * 100, 2)
+    resultado['MARKUP_TOTAL'] = np.nan_to_num(markup, nan=0, posinf=0, neginf=0)
+    resultado['MARGEM_TOTAL'] = np.nan_to_num(margem, nan=0, posinf=0, neginf=0)
+
+    por_fornecedor = cubo[cubo['FORNECEDOR'].isin(fornecedores.ORDEM)]
+    matriz = por_fornecedor.pivot_table(
+        index=['CODUSUR', 'VENDEDOR'], columns='FORNECEDOR', values='POSITIVACOES', aggfunc='sum', observed=True
+    ).reindex(index=resultado.index, columns=fornecedores.ORDEM).fillna(0).astype(np.int64)
+    matriz.columns = list(fornecedores.ORDEM)
+    return pd.concat([resultado, matriz], axis=1).reset_index()
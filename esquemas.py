@@ -0,0 +1,171 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Registro de esquemas por tabela: tipo de cada coluna lida pelas páginas, formato das datas e
+# tratamento de nulos. Colunas que não estão no esquema (identificadores usados em merges entre
+# tabelas, textos livres) ficam como vieram do Supabase.
+#   tipo:        "numero" (float), "inteiro" (int64), "data" (datetime) ou "texto" (str, nulos preservados)
+#   formato:     formato da data ("ISO8601" aceita data e data/hora com fuso)
+#   padrao:      valor que substitui nulos e valores inválidos em números
+#   obrigatoria: linhas sem data válida são descartadas na ingestão
+ESQUEMAS = {
+    "PCPEDC": {
+        "DATA_PEDIDO": {"tipo": "data", "formato": "ISO8601", "obrigatoria": True},
+        "QT": {"tipo": "numero", "padrao": 0},
+        "PVENDA": {"tipo": "numero", "padrao": 0},
+        "CODFILIAL": {"tipo": "texto"},
+    },
+    # Faturamento diário devolvido pela função kpi_pcpedc_diario (sql/kpis_pagina_inicial.sql)
+    "kpi_pcpedc_diario": {
+        "DATA_PEDIDO": {"tipo": "data", "formato": "ISO8601", "obrigatoria": True},
+        "CODFILIAL": {"tipo": "texto"},
+        "VLTOTAL": {"tipo": "numero", "padrao": 0},
+        "PEDIDOS": {"tipo": "inteiro", "padrao": 0},
+        "LINHAS": {"tipo": "inteiro", "padrao": 0},
+    },
+    "PCPEDI": {
+        "created_at": {"tipo": "data", "formato": "ISO8601"},
+        "DATA": {"tipo": "data", "formato": "%Y-%m-%d"},
+        "QT": {"tipo": "numero", "padrao": 0},
+        "PVENDA": {"tipo": "numero", "padrao": 0},
+        "NUMPED": {"tipo": "inteiro", "padrao": 0},
+        "NUMCAR": {"tipo": "inteiro", "padrao": 0},
+        "CODCLI": {"tipo": "inteiro", "padrao": 0},
+        "CODPROD": {"tipo": "inteiro", "padrao": 0},
+    },
+    "PCVENDEDOR": {
+        "DATAPEDIDO": {"tipo": "data", "formato": "ISO8601", "obrigatoria": True},
+        "VALOR": {"tipo": "numero", "padrao": 0},
+        "QUANTIDADE": {"tipo": "numero", "padrao": 0},
+        "CUSTOPRODUTO": {"tipo": "numero", "padrao": 0},
+        "CODIGOVENDA": {"tipo": "inteiro", "padrao": 1},
+        "CODFORNECEDOR": {"tipo": "inteiro", "padrao": 0},
+        "CODPRODUTO": {"tipo": "inteiro", "padrao": 0},
+        "CODCLIENTE": {"tipo": "inteiro", "padrao": 0},
+        "CODFILIAL": {"tipo": "texto"},
+    },
+    "VWSOMELIER": {
+        "DATA": {"tipo": "data", "formato": "ISO8601"},
+        "QT": {"tipo": "numero", "padrao": 0},
+        "PVENDA": {"tipo": "numero", "padrao": 0},
+        "VLCUSTOFIN": {"tipo": "numero", "padrao": 0},
+    },
+    "ESTOQUE": {
+        "QT_ESTOQUE": {"tipo": "numero", "padrao": 0},
+        "QTULTENT": {"tipo": "numero", "padrao": 0},
+        "QTRESERV": {"tipo": "numero", "padrao": 0},
+        "QTINDENIZ": {"tipo": "numero", "padrao": 0},
+        "BLOQUEADA": {"tipo": "numero", "padrao": 0},
+        "DTULTENT": {"tipo": "data", "formato": "ISO8601"},
+        "DTULTSAIDA": {"tipo": "data", "formato": "ISO8601"},
+        "DTULTPEDCC": {"tipo": "data", "formato": "ISO8601"},
+    },
+    "PCMOVENDPEND": {
+        "DTFIMOS": {"tipo": "data", "formato": "ISO8601", "obrigatoria": True},
+    },
+    "PCPEDC_POSICAO": {
+        "DATA": {"tipo": "data", "formato": "ISO8601", "obrigatoria": True},
+        "L_COUNT": {"tipo": "numero", "padrao": 0},
+        "M_COUNT": {"tipo": "numero", "padrao": 0},
+    },
+    "PCPRODUT": {
+        "DESCRICAO": {"tipo": "texto"},
+        "CODAUXILIAR": {"tipo": "texto"},
+        "QTUNITCX": {"tipo": "numero"},
+    },
+}
+
+
+# Tipo compacto dos textos: strings Arrow (sem um objeto Python por célula) com semântica numpy
+# (NaN nos nulos e comparações devolvendo bool), então filtros, merges e groupby seguem iguais
+TEXTO_COMPACTO = "string[pyarrow_numpy]"
+
+# Textos com poucos valores distintos (no máximo um a cada LIMITE_CATEGORIA linhas: vendedores, rotas,
+# filiais, produtos, operações) viram category: um código int8/int16 por linha e cada texto guardado
+# uma vez. Os groupby das páginas usam observed=True (sem o produto cartesiano das categorias).
+LIMITE_CATEGORIA = 10
+
+# Bytes antes e depois da última compactação de cada tabela (relatório da barra lateral)
+_economia: dict = {}
+_trava_economia = threading.Lock()
+
+
+# Função para compactar um frame: textos repetidos em category, os demais em strings Arrow, e inteiros
+# que cabem em int32 rebaixados (códigos como CODUSUR, CODCLIENTE, CODPROD e NUMPED); datas ficam em
+# datetime64 e valores em float64. Com `tabela`, registra os bytes economizados no relatório.
+def compactar(df: pd.DataFrame, tabela: str = None) -> pd.DataFrame:
+    convertidas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) == "string":
+            repetido = serie.nunique() * LIMITE_CATEGORIA <= len(serie)
+            convertidas[coluna] = serie.astype("category" if repetido else TEXTO_COMPACTO)
+        elif serie.dtype == np.int64 and not serie.empty and \
+                np.iinfo(np.int32).min <= serie.min() and serie.max() <= np.iinfo(np.int32).max:
+            convertidas[coluna] = serie.astype(np.int32)
+    if not convertidas:
+        return df
+
+    compacto = df.assign(**convertidas)
+    if tabela:
+        antes = int(df[list(convertidas)].memory_usage(index=False, deep=True).sum())
+        depois = int(compacto[list(convertidas)].memory_usage(index=False, deep=True).sum())
+        with _trava_economia:
+            _economia[tabela] = {"antes": antes, "depois": depois}
+    return compacto
+
+
+# Função para montar o relatório de compactação (bytes das colunas convertidas, por tabela)
+def relatorio() -> pd.DataFrame:
+    with _trava_economia:
+        linhas = [
+            {
+                "Tabela": tabela,
+                "Antes (MB)": round(total["antes"] / 2**20, 1),
+                "Depois (MB)": round(total["depois"] / 2**20, 1),
+                "Economia (MB)": round((total["antes"] - total["depois"]) / 2**20, 1),
+                "Redução": f"{total['antes'] / total['depois']:.1f}x" if total["depois"] else "-",
+            }
+            for tabela, total in sorted(_economia.items())
+        ]
+    return pd.DataFrame(linhas)
+
+
+# Função para converter uma coluna conforme o esquema (colunas já convertidas passam direto)
+def _converter(serie: pd.Series, coluna: dict) -> pd.Series:
+    tipo = coluna["tipo"]
+    if tipo == "data":
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        return pd.to_datetime(serie, errors="coerce", format=coluna.get("formato"))
+    if tipo == "texto":
+        if isinstance(serie.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            return serie
+        return serie.where(serie.isna(), serie.astype(str))
+
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        serie = pd.to_numeric(serie, errors="coerce")
+    if "padrao" in coluna:
+        serie = serie.fillna(coluna["padrao"])
+    if tipo == "inteiro" and not serie.isna().any():
+        return serie if pd.api.types.is_integer_dtype(serie) else serie.astype("int64")
+    return serie.astype("float64") if tipo == "numero" else serie
+
+
+# Função de ingestão: converte de uma vez as colunas do esquema presentes no frame bruto, descarta
+# as linhas sem data obrigatória e compacta o resultado. As páginas chamam logo após a carga e não
+# convertem de novo depois.
+def aplicar(tabela: str, df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
+    esquema = ESQUEMAS.get(tabela, {})
+    colunas = [coluna for coluna in esquema if coluna in df.columns]
+
+    if colunas:
+        df = df.assign(**{coluna: _converter(df[coluna], esquema[coluna]) for coluna in colunas})
+        obrigatorias = [coluna for coluna in colunas if esquema[coluna].get("obrigatoria")]
+        if obrigatorias:
+            df = df.dropna(subset=obrigatorias).reset_index(drop=True)
+    return compactar(df, tabela)
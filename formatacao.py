@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+# Função para formatar um único valor monetário ("R$ 1.234,56", o mesmo texto de formatar_valor das páginas)
+def _moeda(valor) -> str:
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# Função para formatar um único percentual ("12.34%")
+def _percentual(valor) -> str:
+    return f"{valor:.2f}%"
+
+
+# Função para formatar uma coluna inteira: cada valor distinto é formatado uma vez pelo próprio Python
+# (preços, custos e percentuais se repetem muito entre as linhas) e os textos voltam às linhas pelos
+# códigos do factorize. Os valores são agrupados pelos bits do float (0.0 e -0.0 formatam diferente);
+# NaN e infinitos saem como no Python ("nan", "inf").
+def _por_valores_distintos(valores, formatar) -> pd.Series:
+    bits = np.ascontiguousarray(valores, dtype=float).view(np.int64)
+    codigos, distintos = pd.factorize(bits)
+    textos = np.array([formatar(valor) for valor in distintos.view(float)], dtype=object)
+    return pd.Series(textos[codigos], index=getattr(valores, "index", None))
+
+
+# Função para formatar valores monetários em lote ("R$ 1.234,56", o mesmo texto de formatar_valor)
+def moeda(valores) -> pd.Series:
+    return _por_valores_distintos(valores, _moeda)
+
+
+# Função para formatar percentuais em lote ("12.34%", o mesmo texto de f"{valor:.2f}%")
+def percentual(valores) -> pd.Series:
+    return _por_valores_distintos(valores, _percentual)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# Dimensão de fornecedores da positivação (carregada uma vez por processo, na importação do módulo)
+
+# Nome de exibição por código de fornecedor do ERP
+NOMES = {
+    99678: "JTI", 5832: "PMB", 5065: "SEDAS", 6521: "SEDAS", 99209: "GLOBALBEV",
+    999573: "VCT", 91257: "CHIAMULERA", 999574: "MONIN", 99569: "BEAM SUNTORY",
+    24: "GALLO", 999571: "BALY", 90671: "KRUG", 99528: "NATIQUE", 60: "PERNOD",
+    99502: "BACARDI", 99534: "SALTON", 81: "SALTON", 34: "AURORA", 999579: "AURORA",
+    18: "PECCIN", 999577: "FLORESTAL",
+}
+
+# Código interno da BRITVIC (os produtos vêm do ERP com o código de outro fornecedor)
+BRITVIC_TEMP_CODE = 999993
+NOMES[BRITVIC_TEMP_CODE] = "BRITVIC"
+
+# Reatribuições por produto: código do produto -> código do fornecedor que deve receber a venda
+REATRIBUICOES = dict.fromkeys([
+    2798, 1044, 989, 560, 163, 57, 5006, 4988, 4987, 4985, 4415, 4414, 4200, 4199,
+    3871, 3870, 3385, 3123, 3058, 2797, 2796, 2795, 2794, 2793, 1047, 58, 5386,
+    5385, 5303, 5302, 5301, 5300, 5299, 5298, 5297, 5296, 5295, 5294, 5293, 5292,
+    5291, 5290, 5288, 5287, 5286, 5285, 5284, 5283, 5282, 5281, 5280, 5234, 5233,
+    5232, 5231, 5230, 5229, 5228, 5227, 5226, 5225, 5224, 5223, 5222, 5221, 5220,
+    5219, 5218, 5217, 5216, 5215, 5214, 5213, 5212, 5211, 5210, 5209, 5208, 5207,
+    3872, 1038, 988, 278,
+], BRITVIC_TEMP_CODE)
+
+# Ordem de exibição dos fornecedores nos relatórios
+ORDEM = [
+    "GALLO", "GLOBALBEV", "FLORESTAL", "PECCIN", "SEDAS", "JTI", "PMB", "VCT",
+    "CHIAMULERA", "MONIN", "BEAM SUNTORY", "AURORA", "SALTON", "BACARDI",
+    "PERNOD", "BALY", "KRUG", "NATIQUE", "BRITVIC",
+]
+
+# Códigos dos fornecedores acompanhados na positivação (para filtros com isin)
+CODIGOS = np.array(sorted(NOMES))
+
+
+# Função de resolução dos fornecedores de um frame de vendas (CODFORNECEDOR e CODPRODUTO):
+# aplica as reatribuições por produto e troca o código pelo nome com uma junção vetorizada.
+# FORNECEDOR sai categórico na ordem de exibição (fornecedores fora da dimensão depois, pelo código);
+# sem nome na dimensão, usa NOMEFORNECEDOR (se existir) ou o próprio código.
+def resolver(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
+    codigo = df['CODPRODUTO'].map(REATRIBUICOES).fillna(df['CODFORNECEDOR']).astype(df['CODFORNECEDOR'].dtype)
+    nome = codigo.map(NOMES)
+    reserva = df['NOMEFORNECEDOR'] if 'NOMEFORNECEDOR' in df.columns else codigo.astype(str)
+    nome = nome.where(nome.notna(), reserva)
+
+    outros = sorted(set(nome.dropna().unique()) - set(ORDEM))
+    fornecedor = pd.Categorical(nome, categories=ORDEM + outros, ordered=True)
+    return df.assign(CODFORNECEDOR=codigo, FORNECEDOR=fornecedor)
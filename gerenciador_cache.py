@@ -0,0 +1,468 @@
+import functools
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+import esquemas
+
+try:
+    import redis
+except ImportError:  # Camada Redis é opcional
+    redis = None
+
+MB = 1024 * 1024
+
+# Camada compartilhada (L2) em Redis: ativada quando REDIS_URL está no secrets.toml ou no ambiente.
+# A versão entra na chave: mudar o formato dos frames invalida tudo sem apagar nada no Redis.
+VERSAO_CACHE = 1
+PREFIXO_REDIS = "cobata"
+COMPRESSAO_REDIS = "zstd"
+
+# Namespaces do cache: orçamento em bytes (memória dos DataFrames), TTL (janela de frescor) em segundos
+# e por quantos segundos depois do TTL o valor antigo ainda pode ser servido enquanto é atualizado.
+# "l2": False deixa o namespace só na memória do processo (resultados derivados chaveados por versão local)
+NAMESPACES = {
+    "produtos": {"max_bytes": 16 * MB, "ttl": 300, "obsoleto": 0},
+    "pagina_inicial": {"max_bytes": 256 * MB, "ttl": 300, "obsoleto": 3600},
+    "estoque": {"max_bytes": 256 * MB, "ttl": 60, "obsoleto": 3600},
+    "fornecedor": {"max_bytes": 256 * MB, "ttl": 60, "obsoleto": 3600},
+    "pedidos": {"max_bytes": 64 * MB, "ttl": 60, "obsoleto": 3600},
+    "pedidos_venda": {"max_bytes": 128 * MB, "ttl": 60, "obsoleto": 3600},
+    "positivacao": {"max_bytes": 256 * MB, "ttl": 60, "obsoleto": 3600},
+    "positivacao_processado": {"max_bytes": 256 * MB, "ttl": 3600, "obsoleto": 0, "l2": False},
+    "produto": {"max_bytes": 256 * MB, "ttl": 60, "obsoleto": 3600},
+    "vendedores": {"max_bytes": 256 * MB, "ttl": 60, "obsoleto": 3600},
+    # Estado do processo fora das páginas: consultas sincronizadas (sincronizacao), partições diárias
+    # (particoes) e dias agregados (agregados). A validade longa só limita o que ficou sem uso; o limite
+    # real é o orçamento, com os itens menos usados saindo primeiro (voltam do armazenamento se pedidos).
+    "sincronizacao": {"max_bytes": 512 * MB, "ttl": 86400, "obsoleto": 0, "l2": False},
+    "particoes": {"max_bytes": 256 * MB, "ttl": 86400, "obsoleto": 0, "l2": False},
+    "agregados": {"max_bytes": 128 * MB, "ttl": 86400, "obsoleto": 0, "l2": False},
+}
+
+# Configuração usada por namespaces que não estão na lista acima
+NAMESPACE_PADRAO = {"max_bytes": 64 * MB, "ttl": 60, "obsoleto": 0}
+
+# Atualizações em segundo plano (stale-while-revalidate) feitas ao mesmo tempo pelo processo
+MAX_ATUALIZACOES_SIMULTANEAS = 4
+_executor = ThreadPoolExecutor(max_workers=MAX_ATUALIZACOES_SIMULTANEAS, thread_name_prefix="atualizacao")
+
+
+# Função para medir o tamanho de um valor em bytes (DataFrames pela memória real das colunas; dicionários,
+# listas e tuplas somando os itens, como os dicionários de frames das cargas com várias tabelas)
+def tamanho(valor: Any) -> int:
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho(chave) + tamanho(item) for chave, item in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+# Versões dos valores gravados: cada gravação (carga, atualização ou leitura do L2) recebe um número novo
+_versoes = itertools.count(1)
+
+
+# Namespace do cache: entradas em ordem de uso (LRU) com validade própria e contadores
+class _Namespace:
+    def __init__(self, max_bytes: int, ttl: float, obsoleto: float, l2: bool = True):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.obsoleto = obsoleto
+        self.l2 = l2
+        self.entradas: OrderedDict = OrderedDict()  # chave -> (valor, fresco_ate, expira_em, bytes)
+        self.versoes: dict = {}  # chave -> versão do valor guardado
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.obsoletos = 0
+        self.expulsoes = 0
+        self.expirados = 0
+        self.acertos_l2 = 0
+        self.falhas_l2 = 0
+        self.erros_l2 = 0
+        self.atualizacoes = 0
+        self.erros_atualizacao = 0
+        self.coalescidas = 0
+        self.trava = threading.Lock()
+
+    # Incrementa um contador fora dos métodos que já seguram a trava
+    def contar(self, contador: str):
+        with self.trava:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def _remover(self, chave):
+        _, _, _, tamanho_entrada = self.entradas.pop(chave)
+        self.versoes.pop(chave, None)
+        self.bytes -= tamanho_entrada
+
+    def _remover_expirados(self, agora: float):
+        for chave in [c for c, (_, _, expira_em, _) in self.entradas.items() if expira_em <= agora]:
+            self._remover(chave)
+            self.expirados += 1
+
+    # Devolve (valor, fresco); valores fora da janela de frescor voltam com fresco=False até expirarem
+    def obter_com_frescor(self, chave):
+        agora = time.monotonic()
+        with self.trava:
+            entrada = self.entradas.get(chave)
+            if entrada is not None and entrada[2] <= agora:
+                self._remover(chave)
+                self.expirados += 1
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+                return None, False
+            self.entradas.move_to_end(chave)
+            if entrada[1] <= agora:
+                self.obsoletos += 1
+                return entrada[0], False
+            self.acertos += 1
+            return entrada[0], True
+
+    def obter(self, chave, padrao=None):
+        valor, fresco = self.obter_com_frescor(chave)
+        return valor if fresco else padrao
+
+    # Devolve o valor guardado (fresco ou não) sem mexer nos contadores nem na ordem LRU
+    def espiar(self, chave):
+        with self.trava:
+            entrada = self.entradas.get(chave)
+            return None if entrada is None else entrada[0]
+
+    # Devolve a versão do valor guardado (None se a chave não estiver no namespace)
+    def versao(self, chave) -> Optional[int]:
+        with self.trava:
+            return self.versoes.get(chave)
+
+    def gravar(self, chave, valor, ttl: Optional[float] = None):
+        tamanho_valor = tamanho(valor)
+        agora = time.monotonic()
+        with self.trava:
+            if chave in self.entradas:
+                self._remover(chave)
+            # Valores maiores que o orçamento inteiro não são guardados
+            if tamanho_valor > self.max_bytes:
+                return
+            self._remover_expirados(agora)
+            while self.entradas and self.bytes + tamanho_valor > self.max_bytes:
+                self._remover(next(iter(self.entradas)))
+                self.expulsoes += 1
+            fresco_ate = agora + (self.ttl if ttl is None else ttl)
+            self.entradas[chave] = (valor, fresco_ate, fresco_ate + self.obsoleto, tamanho_valor)
+            self.versoes[chave] = next(_versoes)
+            self.bytes += tamanho_valor
+
+    def limpar(self):
+        with self.trava:
+            self.entradas.clear()
+            self.versoes.clear()
+            self.bytes = 0
+
+    def estatisticas(self) -> dict:
+        with self.trava:
+            return {
+                "entradas": len(self.entradas),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "obsoletos": self.obsoletos,
+                "expulsoes": self.expulsoes,
+                "expirados": self.expirados,
+                "acertos_l2": self.acertos_l2,
+                "falhas_l2": self.falhas_l2,
+                "erros_l2": self.erros_l2,
+                "atualizacoes": self.atualizacoes,
+                "erros_atualizacao": self.erros_atualizacao,
+                "coalescidas": self.coalescidas,
+            }
+
+
+# Função para obter os namespaces do processo (compartilhados por todas as sessões)
+@st.cache_resource(show_spinner=False)
+def _namespaces() -> dict:
+    return {}
+
+
+_trava_namespaces = threading.Lock()
+
+
+def _namespace(nome: str) -> _Namespace:
+    namespaces = _namespaces()
+    with _trava_namespaces:
+        if nome not in namespaces:
+            config = NAMESPACES.get(nome, NAMESPACE_PADRAO)
+            namespaces[nome] = _Namespace(config["max_bytes"], config["ttl"], config["obsoleto"], config.get("l2", True))
+        return namespaces[nome]
+
+
+# Função para obter o cliente Redis do processo (None quando a camada L2 não está configurada)
+@st.cache_resource(show_spinner=False)
+def _redis():
+    url = st.secrets.get("REDIS_URL", os.environ.get("REDIS_URL"))
+    if redis is None or not url:
+        return None
+    return redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+
+
+def _chave_redis(namespace: str, chave) -> str:
+    return f"{PREFIXO_REDIS}:v{VERSAO_CACHE}:{namespace}:{chave}"
+
+
+# Dicionários de frames (cargas com várias tabelas) vão ao L2 como esta marca, o tamanho do cabeçalho,
+# um cabeçalho JSON com as chaves e o tamanho de cada frame, e os frames em Arrow IPC um depois do outro
+_MARCA_DICIONARIO = b"cobata-dict\n"
+
+
+# Função para saber se o valor vai ao L2: DataFrames e dicionários de DataFrames com chaves de texto
+def _serializavel(valor) -> bool:
+    if isinstance(valor, pd.DataFrame):
+        return True
+    return isinstance(valor, dict) and all(
+        isinstance(chave, str) and isinstance(item, pd.DataFrame) for chave, item in valor.items()
+    )
+
+
+# Funções para serializar DataFrames (ou dicionários de DataFrames) em Arrow IPC comprimido (e de volta)
+def serializar(valor) -> bytes:
+    if isinstance(valor, dict):
+        partes = [serializar(df) for df in valor.values()]
+        cabecalho = json.dumps({"chaves": list(valor), "tamanhos": [len(parte) for parte in partes]}).encode()
+        return _MARCA_DICIONARIO + len(cabecalho).to_bytes(4, "big") + cabecalho + b"".join(partes)
+    tabela = pa.Table.from_pandas(valor, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    opcoes = pa.ipc.IpcWriteOptions(compression=COMPRESSAO_REDIS)
+    with pa.ipc.new_stream(sink, tabela.schema, options=opcoes) as escritor:
+        escritor.write_table(tabela)
+    return sink.getvalue().to_pybytes()
+
+
+# Textos voltam como o tipo compacto do esquema (os metadados pandas do Arrow trariam string[python])
+_TIPOS_ARROW = dict.fromkeys([pa.string(), pa.large_string()], pd.api.types.pandas_dtype(esquemas.TEXTO_COMPACTO))
+
+
+def desserializar(dados_ipc: bytes):
+    if dados_ipc.startswith(_MARCA_DICIONARIO):
+        inicio = len(_MARCA_DICIONARIO) + 4
+        fim = inicio + int.from_bytes(dados_ipc[inicio - 4:inicio], "big")
+        cabecalho = json.loads(dados_ipc[inicio:fim])
+        valor = {}
+        for chave, tamanho_parte in zip(cabecalho["chaves"], cabecalho["tamanhos"]):
+            valor[chave] = desserializar(dados_ipc[fim:fim + tamanho_parte])
+            fim += tamanho_parte
+        return valor
+    tabela = pa.ipc.open_stream(dados_ipc).read_all()
+    return esquemas.compactar(tabela.to_pandas(types_mapper=_TIPOS_ARROW.get))
+
+
+# Função para ler uma chave do L2 (Redis) e aquecer o L1 com o TTL restante
+def _obter_l2(ns: _Namespace, namespace: str, chave, padrao=None):
+    cliente = _redis() if ns.l2 else None
+    if cliente is None:
+        return padrao
+    try:
+        with cliente.pipeline() as pipe:
+            conteudo, restante_ms = pipe.get(_chave_redis(namespace, chave)).pttl(_chave_redis(namespace, chave)).execute()
+        if conteudo is None:
+            ns.contar("falhas_l2")
+            return padrao
+        valor = desserializar(conteudo)
+    except (redis.RedisError, pa.ArrowException, ValueError):
+        ns.contar("erros_l2")
+        return padrao
+    ns.contar("acertos_l2")
+    ns.gravar(chave, valor, restante_ms / 1000 if restante_ms and restante_ms > 0 else None)
+    return valor
+
+
+# Função para ler uma chave do namespace (devolve `padrao` se não existir ou tiver expirado).
+# Falha no L1 (memória do processo) consulta o L2 (Redis).
+def obter(namespace: str, chave, padrao=None):
+    ns = _namespace(namespace)
+    valor = ns.obter(chave, None)
+    if valor is not None:
+        return valor
+    return _obter_l2(ns, namespace, chave, padrao)
+
+
+# Função para gravar uma chave no namespace (ttl opcional substitui o TTL padrão do namespace).
+# DataFrames e dicionários de DataFrames também vão para o L2, para que um processo aqueça os outros.
+def gravar(namespace: str, chave, valor, ttl: Optional[float] = None):
+    ns = _namespace(namespace)
+    ns.gravar(chave, valor, ttl)
+
+    cliente = _redis() if ns.l2 and _serializavel(valor) else None
+    if cliente is None:
+        return
+    try:
+        conteudo = serializar(valor)
+        if len(conteudo) <= ns.max_bytes:
+            cliente.set(_chave_redis(namespace, chave), conteudo, px=math.ceil((ns.ttl if ttl is None else ttl) * 1000))
+    except (pa.ArrowException, TypeError, ValueError):
+        # Colunas com tipos mistos não viram Arrow: o valor fica só no L1
+        pass
+    except redis.RedisError:
+        ns.contar("erros_l2")
+
+
+# Função para saber se um resultado veio vazio (DataFrame vazio ou dicionário só de frames vazios)
+def _vazio(valor) -> bool:
+    if isinstance(valor, pd.DataFrame):
+        return valor.empty
+    if isinstance(valor, dict):
+        return all(_vazio(item) for item in valor.values())
+    return valor is None
+
+
+# Cargas em andamento (single-flight): uma carga por chave no processo; sessões que pedem a mesma
+# chave enquanto ela carrega esperam o mesmo Future em vez de repetir o download
+_voos: dict = {}  # (namespace, chave) -> Future
+_trava_voos = threading.Lock()
+
+
+# Função para entrar na carga de uma chave: devolve o Future e True se esta thread é quem carrega
+def _voo(namespace: str, chave) -> tuple[Future, bool]:
+    with _trava_voos:
+        voo = _voos.get((namespace, chave))
+        if voo is not None:
+            return voo, False
+        voo = _voos[(namespace, chave)] = Future()
+        return voo, True
+
+
+# Função de carga de uma chave: troca o valor de uma vez só quando a nova carga termina e entrega o
+# resultado a quem estiver esperando. Um resultado vazio não substitui um valor com dados (falha de rede).
+def _carregar(namespace: str, chave, carregar: Callable[[], Any], ttl: Optional[float], voo: Future):
+    ns = _namespace(namespace)
+    try:
+        valor = carregar()
+        antigo = ns.espiar(chave)
+        if not _vazio(valor) or _vazio(antigo):
+            gravar(namespace, chave, valor, ttl)
+        else:
+            valor = antigo
+        voo.set_result(valor)
+        return valor
+    except BaseException as e:
+        voo.set_exception(e)
+        raise
+    finally:
+        with _trava_voos:
+            _voos.pop((namespace, chave), None)
+
+
+# Função de atualização (segundo plano ou agendador) de uma chave que já tem valor
+def _atualizar(namespace: str, chave, carregar: Callable[[], Any], ttl: Optional[float], voo: Future):
+    ns = _namespace(namespace)
+    try:
+        _carregar(namespace, chave, carregar, ttl, voo)
+        ns.contar("atualizacoes")
+    except Exception:
+        ns.contar("erros_atualizacao")
+        raise
+
+
+# Função para recarregar uma chave agora, na thread atual (usada pelo agendador de pré-carga).
+# Devolve False quando outra carga da mesma chave já está em andamento.
+def recarregar(namespace: str, chave, carregar: Callable[[], Any], ttl: Optional[float] = None) -> bool:
+    voo, lider = _voo(namespace, chave)
+    if not lider:
+        return False
+    _atualizar(namespace, chave, carregar, ttl, voo)
+    return True
+
+
+# Função stale-while-revalidate: valor fresco é devolvido direto; valor fora da janela de frescor é
+# devolvido na hora e atualizado em segundo plano (uma atualização por chave); sem valor, carrega agora.
+# Sessões simultâneas sem valor esperam a mesma carga (uma única consulta ao Supabase por chave).
+def obter_ou_carregar(namespace: str, chave, carregar: Callable[[], Any], ttl: Optional[float] = None):
+    ns = _namespace(namespace)
+    valor, fresco = ns.obter_com_frescor(chave)
+    if valor is None:
+        valor = _obter_l2(ns, namespace, chave)
+        if valor is not None:
+            return valor
+        voo, lider = _voo(namespace, chave)
+        if not lider:
+            ns.contar("coalescidas")
+            return voo.result()
+        return _carregar(namespace, chave, carregar, ttl, voo)
+
+    if not fresco:
+        voo, lider = _voo(namespace, chave)
+        if lider:
+            _executor.submit(_atualizar, namespace, chave, carregar, ttl, voo)
+    return valor
+
+
+# Função para obter a versão do valor de uma chave no L1 (None se não estiver em memória)
+def versao(namespace: str, chave) -> Optional[int]:
+    return _namespace(namespace).versao(chave)
+
+
+# Função para entregar uma cópia rasa dos frames (a página pode criar ou trocar colunas sem alterar o cache)
+def _copia(valor):
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=False)
+    if isinstance(valor, dict):
+        return {chave: _copia(item) for chave, item in valor.items()}
+    if isinstance(valor, tuple):
+        return tuple(_copia(item) for item in valor)
+    return valor
+
+
+# Decorador de cache das funções de carga das páginas (substitui @st.cache_data + auto_reload):
+# a chave é o nome da função e os argumentos, com stale-while-revalidate pelo namespace.
+# `funcao.recarregar(*args)` recarrega a mesma chave na hora (pré-carga do agendador) e
+# `funcao.versao(*args)` devolve a versão do valor em memória (chave da memorização dos derivados).
+def em_cache(namespace: str, ttl: Optional[float] = None):
+    def decorador(funcao):
+        def chave(args, kwargs):
+            argumentos = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode()).hexdigest()
+            return f"{funcao.__qualname__}:{argumentos}"
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            return _copia(obter_ou_carregar(namespace, chave(args, kwargs), lambda: funcao(*args, **kwargs), ttl))
+
+        envolvida.recarregar = lambda *args, **kwargs: recarregar(
+            namespace, chave(args, kwargs), lambda: funcao(*args, **kwargs), ttl
+        )
+        envolvida.versao = lambda *args, **kwargs: versao(namespace, chave(args, kwargs))
+        return envolvida
+    return decorador
+
+
+# Função de memorização de resultados derivados (frames processados, relatórios, planilhas): calcula uma
+# vez por chave e devolve cópias rasas. A chave deve trazer a versão dos dados de origem (em_cache.versao),
+# assim uma recarga dos dados gera chaves novas e as antigas saem pelo LRU.
+def memorizar(namespace: str, chave, calcular: Callable[[], Any], ttl: Optional[float] = None):
+    return _copia(obter_ou_carregar(namespace, chave, calcular, ttl))
+
+
+# Função para limpar um namespace (ou todos) no L1; no Redis as chaves expiram pelo TTL
+def limpar(namespace: Optional[str] = None):
+    nomes = [namespace] if namespace else list(_namespaces())
+    for nome in nomes:
+        _namespace(nome).limpar()
+
+
+# Função para obter os contadores de todos os namespaces (acertos, falhas, expulsões e bytes usados)
+def estatisticas() -> dict:
+    return {nome: _namespace(nome).estatisticas() for nome in list(_namespaces())}
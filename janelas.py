@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+# Janelas de data sobre frames ordenados pela coluna de data: os frames em cache são ordenados uma vez
+# (ordenar) e cada filtro vira duas buscas binárias e uma fatia contígua (iloc, sem copiar as linhas),
+# em vez de comparar a coluna inteira com datetime.date a cada filtro. Datas nulas ficam no início
+# da ordem e nunca caem numa janela.
+
+
+# Função para ordenar um frame pela coluna de data (estável, nulos primeiro); frames já ordenados passam direto
+def ordenar(df: pd.DataFrame, coluna: str) -> pd.DataFrame:
+    if df.empty or coluna not in df.columns:
+        return df
+    instantes = df[coluna].array.asi8  # NaT é o menor inteiro, então nulos primeiro mantêm a ordem
+    if np.all(instantes[1:] >= instantes[:-1]):
+        return df
+    return df.sort_values(coluna, kind="stable", na_position="first", ignore_index=True)
+
+
+# Função para converter um dia no inteiro da meia-noite no fuso e na unidade da coluna (mesma escala de asi8)
+def _instante(serie: pd.Series, dia: date) -> int:
+    instante = pd.Timestamp(dia)
+    if serie.dt.tz is not None:
+        instante = instante.tz_localize(serie.dt.tz)
+    return int(instante.as_unit(serie.dt.unit).asm8.view("i8"))
+
+
+# Função para fatiar o intervalo de dias [inicio, fim] (dias inteiros, fim incluído) de um frame ordenado
+def fatiar(df: pd.DataFrame, coluna: str, inicio, fim) -> pd.DataFrame:
+    if df.empty:
+        return df
+    inicio, fim = armazenamento.para_data(inicio), armazenamento.para_data(fim)
+    serie = df[coluna]
+    instantes = serie.array.asi8
+    primeira = np.searchsorted(instantes, _instante(serie, inicio), side="left")
+    ultima = np.searchsorted(instantes, _instante(serie, fim + timedelta(days=1)), side="left")
+    return df.iloc[primeira:max(primeira, ultima)]
+
+
+# Função para fatiar um dia
+def dia(df: pd.DataFrame, coluna: str, data) -> pd.DataFrame:
+    return fatiar(df, coluna, data, data)
+
+
+# Função para fatiar a semana (segunda a domingo) que contém o dia
+def semana(df: pd.DataFrame, coluna: str, data) -> pd.DataFrame:
+    data = armazenamento.para_data(data)
+    segunda = data - timedelta(days=data.weekday())
+    return fatiar(df, coluna, segunda, segunda + timedelta(days=6))
+
+
+# Função para fatiar um mês do calendário
+def mes(df: pd.DataFrame, coluna: str, ano: int, mes: int) -> pd.DataFrame:
+    seguinte = date(ano + mes // 12, mes % 12 + 1, 1)
+    return fatiar(df, coluna, date(ano, mes, 1), seguinte - timedelta(days=1))
+
+
+# Função para fatiar um ano do calendário
+def ano(df: pd.DataFrame, coluna: str, ano: int) -> pd.DataFrame:
+    return fatiar(df, coluna, date(ano, 1, 1), date(ano, 12, 31))
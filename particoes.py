@@ -0,0 +1,78 @@
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+import armazenamento
+import esquemas
+import gerenciador_cache
+
+# Namespace do gerenciador de cache com as partições diárias ((consulta, dia) -> linhas do dia): o orçamento
+# em bytes limita a memória e os dias menos usados saem primeiro (voltam do armazenamento se pedidos)
+NAMESPACE = "particoes"
+
+
+# Função para obter as travas de preenchimento por consulta (compartilhadas por todas as sessões do processo)
+@st.cache_resource(show_spinner=False)
+def _travas() -> dict:
+    return {}
+
+
+_trava_travas = threading.Lock()
+
+
+def _consulta(spec: dict) -> tuple:
+    return (spec.get("projeto", "principal"), spec["table"], repr(spec.get("columns", "*")), repr(spec.get("filters", [])))
+
+
+def _trava(consulta: tuple) -> threading.Lock:
+    with _trava_travas:
+        return _travas().setdefault(consulta, threading.Lock())
+
+
+# Função para juntar os dias faltantes em intervalos contínuos (uma consulta por lacuna)
+def lacunas(dias: list[date]) -> list[tuple[date, date]]:
+    intervalos = []
+    for dia in sorted(dias):
+        if intervalos and dia == intervalos[-1][1] + timedelta(days=1):
+            intervalos[-1] = (intervalos[-1][0], dia)
+        else:
+            intervalos.append((dia, dia))
+    return intervalos
+
+
+# Função para ler um intervalo qualquer a partir de partições diárias: só os dias que ainda não estão
+# em memória são buscados (lacunas contíguas numa consulta cada) e o resultado é a concatenação dos dias.
+# Os dias dentro da carência do armazenamento (lançamentos recentes) não são guardados e são relidos sempre.
+def carregar(spec: dict, data_inicial, data_final) -> pd.DataFrame:
+    inicio = armazenamento.para_data(data_inicial)
+    fim = armazenamento.para_data(data_final)
+    if inicio > fim:
+        return pd.DataFrame()
+
+    coluna_data = spec["date_column"]
+    limite = date.today() - timedelta(days=armazenamento.DIAS_CARENCIA)
+    consulta = _consulta(spec)
+    dias = [inicio + timedelta(days=n) for n in range((min(fim, limite) - inicio).days + 1)]
+    partes = []
+
+    with _trava(consulta):
+        guardados = {dia: gerenciador_cache.obter(NAMESPACE, (consulta, dia)) for dia in dias}
+        faltando = [dia for dia, df in guardados.items() if df is None]
+        for primeiro, ultimo in lacunas(faltando):
+            df = esquemas.compactar(armazenamento.carregar(spec, primeiro, ultimo), spec["table"])
+            vazio = df.iloc[0:0]
+            por_dia = {} if df.empty else dict(tuple(df.groupby(df[coluna_data].astype(str).str[:10])))
+            for n in range((ultimo - primeiro).days + 1):
+                dia = primeiro + timedelta(days=n)
+                guardados[dia] = por_dia.get(dia.isoformat(), vazio).reset_index(drop=True)
+                gerenciador_cache.gravar(NAMESPACE, (consulta, dia), guardados[dia])
+        partes = [guardados[dia] for dia in dias]
+
+    # Dias recentes: sempre do armazenamento (mês aberto pela sincronização incremental)
+    if fim > limite:
+        partes.append(armazenamento.carregar(spec, max(inicio, limite + timedelta(days=1)), fim))
+
+    partes = [parte for parte in partes if not parte.empty]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
@@ -0,0 +1,149 @@
+import threading
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+# Métricas da série diária: faturamento, pedidos distintos e linhas de PCPEDC por dia e filial
+METRICAS = ("VLTOTAL", "PEDIDOS", "LINHAS")
+
+
+# Série diária do faturamento por filial: dias contíguos desde o primeiro pedido (dias sem venda valem
+# zero), uma coluna por filial e, para cada métrica, as somas acumuladas com uma linha de zeros à frente.
+# A soma de qualquer período contíguo é acumulado[fim + 1] - acumulado[inicio], então os cards e o
+# gráfico não dependem do tamanho da tabela; escolher filiais é escolher colunas.
+# PEDIDOS é uma contagem distinta por (dia, filial) e a soma de dias e filiais só conta cada pedido uma vez
+# porque no ERP um pedido tem uma única DATA_PEDIDO e uma única CODFILIAL, repetidas em todas as suas
+# linhas de PCPEDC. Se um pedido passar a ter linhas em dias ou filiais diferentes, ele é contado uma vez
+# por dia e filial (tests/test_serie_diaria.py compara com o nunique sobre as linhas).
+class SerieDiaria:
+    def __init__(self):
+        self.inicio: Optional[date] = None
+        self.filiais: list[str] = []
+        self.valores = {metrica: np.zeros((0, 0)) for metrica in METRICAS}  # [dia, filial]
+        self.acumulados = {metrica: np.zeros((1, 0)) for metrica in METRICAS}  # [dia + 1, filial]
+        self.atualizado_em: Optional[float] = None  # time.monotonic() da última atualização
+        self.trava = threading.Lock()
+
+    @property
+    def dias(self) -> int:
+        return len(self.valores[METRICAS[0]])
+
+    @property
+    def fim(self) -> Optional[date]:
+        return None if self.inicio is None else self.inicio + timedelta(days=self.dias - 1)
+
+    # Dia a partir do qual a próxima atualização deve reenviar tudo (dias recentes ainda recebem lançamentos)
+    def desde(self) -> Optional[date]:
+        if self.inicio is None:
+            return None
+        return max(self.inicio, self.fim - timedelta(days=armazenamento.DIAS_CARENCIA))
+
+    # Função de atualização incremental: `diario` (DATA_PEDIDO, CODFILIAL e as métricas, um dia por linha e
+    # filial) substitui todos os dias a partir do seu primeiro dia; só os acumulados desses dias são refeitos.
+    # Os arrays novos são montados à parte e trocados de uma vez (leitores veem a série antiga ou a nova).
+    def atualizar(self, diario: pd.DataFrame):
+        if diario.empty:
+            self.atualizado_em = time.monotonic()
+            return
+        dias = diario['DATA_PEDIDO'].dt.normalize()
+        primeiro, ultimo = dias.min().date(), dias.max().date()
+        inicio = primeiro if self.inicio is None else min(self.inicio, primeiro)
+        fim = ultimo if self.fim is None else max(self.fim, ultimo)
+        filiais = self.filiais + sorted(set(diario['CODFILIAL'].astype(str)) - set(self.filiais))
+        n_dias = (fim - inicio).days + 1
+
+        # Dias anteriores ao primeiro dia reenviado mantêm valores e acumulados (sem recalcular)
+        a_partir = (primeiro - inicio).days
+        if self.inicio != inicio or a_partir > self.dias:
+            a_partir = 0
+        linha = (dias - pd.Timestamp(inicio)).dt.days.to_numpy()
+        coluna = pd.Index(filiais).get_indexer(diario['CODFILIAL'].astype(str))
+
+        novos_valores, novos_acumulados = {}, {}
+        for metrica in METRICAS:
+            valores = np.zeros((n_dias, len(filiais)))
+            acumulados = np.zeros((n_dias + 1, len(filiais)))
+            if a_partir:
+                valores[:a_partir, :len(self.filiais)] = self.valores[metrica][:a_partir]
+                acumulados[:a_partir + 1, :len(self.filiais)] = self.acumulados[metrica][:a_partir + 1]
+            elif self.inicio is not None:
+                # Série realinhada (dias antes do início atual): copia os valores e refaz os acumulados
+                antes = (self.inicio - inicio).days
+                valores[antes:antes + self.dias, :len(self.filiais)] = self.valores[metrica]
+                valores[(primeiro - inicio).days:] = 0
+            np.add.at(valores, (linha, coluna), diario[metrica].to_numpy(dtype=float))
+            acumulados[a_partir + 1:] = acumulados[a_partir] + np.cumsum(valores[a_partir:], axis=0)
+            novos_valores[metrica], novos_acumulados[metrica] = valores, acumulados
+
+        with self.trava:
+            self.inicio, self.filiais = inicio, filiais
+            self.valores, self.acumulados = novos_valores, novos_acumulados
+            self.atualizado_em = time.monotonic()
+
+    # Função para somar as métricas das filiais escolhidas no período [inicio, fim] (dias inteiros)
+    def somar(self, filiais, inicio, fim) -> dict:
+        with self.trava:
+            serie_inicio, serie_filiais, acumulados = self.inicio, self.filiais, self.acumulados
+        colunas = [serie_filiais.index(filial) for filial in filiais if filial in serie_filiais]
+        if serie_inicio is None or not colunas:
+            return dict.fromkeys(METRICAS, 0.0)
+        n_dias = len(acumulados[METRICAS[0]]) - 1
+        primeira = min(max((armazenamento.para_data(inicio) - serie_inicio).days, 0), n_dias)
+        ultima = min(max((armazenamento.para_data(fim) - serie_inicio).days + 1, primeira), n_dias)
+        return {
+            metrica: float((acumulados[metrica][ultima, colunas] - acumulados[metrica][primeira, colunas]).sum())
+            for metrica in METRICAS
+        }
+
+    # Função para somar as métricas por mês dentro de [inicio, fim] (um par de acumulados por mês);
+    # devolve Ano, Mês e as métricas, só dos meses com alguma linha de pedido
+    def mensal(self, filiais, inicio, fim) -> pd.DataFrame:
+        inicio, fim = armazenamento.para_data(inicio), armazenamento.para_data(fim)
+        meses = pd.period_range(inicio, fim, freq='M')
+        linhas = []
+        for mes in meses:
+            somas = self.somar(filiais, max(inicio, mes.start_time.date()), min(fim, mes.end_time.date()))
+            linhas.append({'Ano': mes.year, 'Mês': mes.month, **somas})
+        mensal = pd.DataFrame(linhas, columns=['Ano', 'Mês', *METRICAS])
+        return mensal[mensal['LINHAS'] > 0].reset_index(drop=True)
+
+
+# Função para agregar linhas de PCPEDC (DATA_PEDIDO, CODFILIAL, NUMPED e VLTOTAL) em faturamento, pedidos
+# distintos e linhas por dia e filial, no formato da função kpi_pcpedc_diario (sql/kpis_pagina_inicial.sql)
+def agregar(data: pd.DataFrame) -> pd.DataFrame:
+    return data.groupby([data['DATA_PEDIDO'].dt.normalize(), 'CODFILIAL'], observed=True).agg(
+        VLTOTAL=('VLTOTAL', 'sum'),
+        PEDIDOS=('NUMPED', 'nunique'),
+        LINHAS=('NUMPED', 'size')
+    ).reset_index()
+
+
+# Períodos dos cards: (primeiro dia, último dia) de cada um
+def periodos(hoje: date) -> dict:
+    ontem = hoje - timedelta(days=1)
+    semana_inicial = hoje - timedelta(days=hoje.weekday())
+    mes_inicial = hoje.replace(day=1)
+    mes_anterior_final = mes_inicial - timedelta(days=1)
+    proximo_mes = (mes_inicial + timedelta(days=31)).replace(day=1)
+    return {
+        'hoje': (hoje, hoje),
+        'ontem': (ontem, ontem),
+        'semana_atual': (semana_inicial, hoje),
+        'semana_passada': (semana_inicial - timedelta(days=7), semana_inicial - timedelta(days=1)),
+        'mes_atual': (mes_inicial, proximo_mes - timedelta(days=1)),
+        'mes_anterior': (mes_anterior_final.replace(day=1), mes_anterior_final),
+    }
+
+
+# Função para calcular {período: (faturamento, pedidos)} das filiais escolhidas (duas leituras de acumulados por período)
+def resumo(serie: SerieDiaria, filiais, hoje: date) -> dict:
+    resultado = {}
+    for periodo, (inicio, fim) in periodos(hoje).items():
+        somas = serie.somar(filiais, inicio, fim)
+        resultado[periodo] = (somas['VLTOTAL'], int(somas['PEDIDOS']))
+    return resultado
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any
+
+import pandas as pd
+
+import dados
+import esquemas
+import gerenciador_cache
+
+# Namespace do gerenciador de cache com as consultas sincronizadas do processo (cada combinação de tabela,
+# filtros e período): o orçamento em bytes conta o frame de cada estado e os menos usados saem primeiro
+# (a próxima chamada da consulta expulsa baixa tudo de novo)
+NAMESPACE = "sincronizacao"
+
+# Segundos entre recargas completas de uma consulta (padrão de "ressincronizar" na especificação). A busca
+# incremental pela marca só traz linhas inseridas: alterações (UPDATE) e exclusões de linhas já vistas só
+# aparecem na recarga completa, então este é o atraso máximo delas.
+RESSINCRONIZAR_SEGUNDOS = 900
+
+
+# Estado de uma consulta sincronizada: linhas já baixadas, a marca d'água (maior valor visto da coluna marca)
+# e o time.monotonic() da última carga completa
+class _Estado:
+    def __init__(self):
+        self.df = pd.DataFrame()
+        self.marca: Any = None
+        self.carregado_em: float = 0.0
+        self.trava = threading.Lock()
+
+    # Tamanho no orçamento do gerenciador de cache (gerenciador_cache.tamanho usa sys.getsizeof): o frame
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + gerenciador_cache.tamanho(self.df)
+
+
+_trava_estados = threading.Lock()
+
+
+# Função para obter a chave do estado da consulta descrita pela especificação e pelo período
+def _chave(spec: dict, data_inicial, data_final) -> tuple:
+    return (
+        spec.get("projeto", "principal"),
+        spec["table"],
+        repr(spec.get("columns", "*")),
+        repr(spec.get("filters", [])),
+        str(data_inicial),
+        str(data_final),
+    )
+
+
+# Função para obter (ou criar) o estado da consulta (compartilhado por todas as sessões do processo)
+def _estado(chave: tuple) -> _Estado:
+    with _trava_estados:
+        estado = gerenciador_cache.obter(NAMESPACE, chave)
+        if estado is None:
+            estado = _Estado()
+            gerenciador_cache.gravar(NAMESPACE, chave, estado)
+        return estado
+
+
+# Função para incluir a coluna marca e as colunas da chave de negócio no select da especificação
+def _spec_sincronizada(spec: dict) -> dict:
+    columns = spec.get("columns", "*")
+    if isinstance(columns, str):
+        return spec
+    extras = [spec["marca"]] + list(spec.get("chave_negocio", []))
+    return {**spec, "columns": list(columns) + [col for col in dict.fromkeys(extras) if col not in columns]}
+
+
+# Função para mesclar as linhas novas no frame com semântica de upsert pela chave de negócio:
+# linhas antigas com a mesma chave são trocadas pelas novas (repetições dentro de um lote são mantidas)
+def mesclar(df: pd.DataFrame, novos: pd.DataFrame, chave_negocio) -> pd.DataFrame:
+    if novos.empty:
+        return df
+    if df.empty:
+        return novos.reset_index(drop=True)
+    chave_negocio = list(chave_negocio)
+    substituidas = pd.MultiIndex.from_frame(df[chave_negocio]).isin(pd.MultiIndex.from_frame(novos[chave_negocio]))
+    return pd.concat([df[~substituidas], novos], ignore_index=True)
+
+
+# Função de sincronização incremental: a primeira chamada baixa a consulta inteira e guarda a marca d'água;
+# as seguintes buscam só as linhas com marca maior que a última vista e fazem upsert pela chave de negócio.
+# A cada "ressincronizar" segundos (RESSINCRONIZAR_SEGUNDOS por padrão; 0 recarrega sempre) a consulta é
+# baixada inteira de novo e substitui o estado, trazendo as linhas alteradas e descartando as excluídas.
+# Especificação: as chaves de dados.compilar mais "marca", "chave_negocio" e "ressincronizar". A marca precisa
+# ser única e crescente (id): as páginas são ordenadas por ela e a retomada usa gt, então valores repetidos
+# (created_at, datas) embaralhariam as páginas e perderiam as linhas que empatam com a última marca vista.
+# Devolve uma cópia do frame bruto (a página pode converter os tipos sem alterar o estado).
+def sincronizar(spec: dict, data_inicial=None, data_final=None) -> pd.DataFrame:
+    spec = _spec_sincronizada(spec)
+    marca = spec["marca"]
+    chave = _chave(spec, data_inicial, data_final)
+    estado = _estado(chave)
+
+    with estado.trava:
+        agora = time.monotonic()
+        intervalo = spec.get("ressincronizar", RESSINCRONIZAR_SEGUNDOS)
+        if estado.marca is None or agora - estado.carregado_em >= intervalo:
+            novos = pd.DataFrame(dados.fetch_spec(spec, data_inicial, data_final))
+            estado.df, estado.marca, estado.carregado_em = pd.DataFrame(), None, agora
+        else:
+            columns, filtros, _ = dados.compilar(spec, data_inicial, data_final)
+            filtros.append((marca, "gt", estado.marca))
+            novos = pd.DataFrame(dados.fetch_paralelo(
+                spec["table"], columns, filtros, chave=marca, projeto=spec.get("projeto", "principal")
+            ))
+        # Frame compactado depois do upsert: as colunas que o concat devolveu como object (categorias
+        # diferentes entre o estado e o lote) voltam aos tipos compactos
+        estado.df = esquemas.compactar(mesclar(estado.df, novos, spec.get("chave_negocio", [marca])), spec["table"])
+        if not novos.empty and marca in novos.columns and novos[marca].notna().any():
+            maior = novos[marca].max()
+            estado.marca = maior if estado.marca is None else max(estado.marca, maior)
+        # Gravado de novo para o orçamento contar o tamanho atual do frame
+        gerenciador_cache.gravar(NAMESPACE, chave, estado)
+        return estado.df.copy()
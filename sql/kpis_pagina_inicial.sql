@@ -0,0 +1,40 @@
+-- Indicadores da Página Inicial calculados no banco (expostos via PostgREST em /rpc/<função>)
+-- Aplicar no editor SQL do Supabase do projeto principal.
+
+-- Valor numérico de uma coluna que pode vir como texto (equivale ao pd.to_numeric(errors='coerce').fillna(0))
+create or replace function kpi_numero(valor anyelement)
+returns numeric
+language sql
+immutable
+as $$
+    select case
+        when valor::text ~ '^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$' then valor::text::numeric
+        else 0
+    end
+$$;
+
+-- Faturamento (PVENDA * QT), pedidos distintos (NUMPED) e linhas por dia e filial, a partir de p_desde
+-- (todos os dias quando nulo). Alimenta a série diária com somas acumuladas da Página Inicial, que só
+-- pede de novo os dias recentes; os períodos dos cards são diferenças de acumulados nessa série.
+-- Os pedidos distintos de dias e filiais diferentes são somados: vale porque um pedido tem uma única
+-- DATA_PEDIDO e uma única CODFILIAL.
+drop function if exists kpi_pcpedc_diario(text[]);
+drop function if exists kpi_pcpedc_resumo(date, text[]);
+
+create or replace function kpi_pcpedc_diario(p_filiais text[] default array['1', '2'], p_desde date default null)
+returns table ("DATA_PEDIDO" date, "CODFILIAL" text, "VLTOTAL" numeric, "PEDIDOS" bigint, "LINHAS" bigint)
+language sql
+stable
+as $$
+    select
+        p."DATA_PEDIDO"::date,
+        p."CODFILIAL"::text,
+        sum(kpi_numero(p."PVENDA") * kpi_numero(p."QT")),
+        count(distinct p."NUMPED"),
+        count(*)
+    from "PCPEDC" p
+    where p."DATA_PEDIDO" is not null
+      and p."CODFILIAL"::text = any (p_filiais)
+      and (p_desde is null or p."DATA_PEDIDO"::date >= p_desde)
+    group by 1, 2
+$$;
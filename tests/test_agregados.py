@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregados
+import armazenamento
+import gerenciador_cache
+import vendas_produto
+
+INICIO = date(2025, 5, 1)
+
+
+# Relógio controlado pelo teste: agregados usa date.today() para a janela e a carência
+class Hoje(date):
+    atual = INICIO
+
+    @classmethod
+    def today(cls):
+        return cls.atual
+
+
+# VWSOMELIER falso no armazenamento: o produto 1 vende nos dias 1 e 2 (0.1 + 0.2 não volta a zero
+# subtraindo 0.1 e 0.2) e o produto 2 vende todo dia
+def vendas(primeiro, ultimo):
+    linhas = []
+    dia = primeiro
+    while dia <= ultimo:
+        if dia in (INICIO, INICIO + timedelta(days=1)):
+            preco = 0.1 if dia == INICIO else 0.2
+            linhas.append({"DESCRICAO_1": "PRODUTO 1", "CODPROD": 1, "DATA": dia.isoformat(), "QT": 1,
+                           "PVENDA": preco, "VLCUSTOFIN": preco, "CODOPER": "S", "id": len(linhas) + 1})
+        linhas.append({"DESCRICAO_1": "PRODUTO 2", "CODPROD": 2, "DATA": dia.isoformat(), "QT": 2,
+                       "PVENDA": 5.0, "VLCUSTOFIN": 3.0, "CODOPER": "S", "id": len(linhas) + 1})
+        dia += timedelta(days=1)
+    return pd.DataFrame(linhas)
+
+
+@pytest.fixture
+def armazenamento_falso(mocker):
+    gerenciador_cache.limpar(agregados.NAMESPACE)
+    agregados._janelas.clear()
+    mocker.patch.object(agregados, "date", Hoje)
+    leituras = []
+
+    def carregar(spec, primeiro, ultimo):
+        leituras.append((primeiro, ultimo))
+        return vendas(armazenamento.para_data(primeiro), armazenamento.para_data(ultimo))
+
+    mocker.patch.object(armazenamento, "carregar", side_effect=carregar)
+    yield leituras
+    gerenciador_cache.limpar(agregados.NAMESPACE)
+    agregados._janelas.clear()
+
+
+def somar(dias=7):
+    return agregados.somar_janela(vendas_produto.CONSULTA_VWSOMELIER, vendas_produto.agregar, ['CODPROD'],
+                                  vendas_produto.METRICAS, dias).set_index('CODPROD')
+
+
+def test_produto_sai_da_janela_movel_depois_da_ultima_venda(armazenamento_falso):
+    Hoje.atual = INICIO + timedelta(days=5)
+    total = somar()
+    assert total.loc[1, "LINHAS"] == 2
+    assert total.loc[1, "VALOR"] == pytest.approx(0.3)
+
+    # A janela avança um dia por leitura: sai o dia 1, depois o dia 2 (última venda do produto 1)
+    Hoje.atual += timedelta(days=3)
+    total = somar()
+    assert total.loc[1, "LINHAS"] == 1
+    assert total.loc[1, "VALOR"] == pytest.approx(0.2)
+
+    Hoje.atual += timedelta(days=1)
+    total = somar()
+    assert 1 not in total.index
+    assert total["LINHAS"].dtype == np.int64
+    assert total.loc[2, "LINHAS"] == 8
+    assert total.loc[2, "QT"] == 16
+
+
+def test_janela_movel_igual_a_soma_do_periodo_inteiro(armazenamento_falso):
+    for passo in range(12):
+        Hoje.atual = INICIO + timedelta(days=passo)
+        movel = somar()
+        inicio = Hoje.atual - timedelta(days=7)
+        esperado = vendas_produto.carregar(inicio, Hoje.atual).groupby('CODPROD')[vendas_produto.METRICAS].sum()
+        pd.testing.assert_frame_equal(movel, esperado, check_dtype=False, check_exact=False)
+        assert movel["LINHAS"].dtype == np.int64
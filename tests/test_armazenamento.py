@@ -0,0 +1,96 @@
+import threading
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import armazenamento
+import dados
+import sincronizacao
+
+# Especificação com uma pasta por filial dentro do mês (como a de PCPEDC na Página Inicial)
+SPEC = {
+    "table": "PCPEDC",
+    "columns": ['id', 'NUMPED', 'DATA_PEDIDO', 'QT', 'CODFILIAL'],
+    "date_column": "DATA_PEDIDO",
+    "particao_filial": "CODFILIAL",
+}
+
+
+# Linhas de um período já fechado: um pedido por dia e filial
+def linhas(inicio, fim, filiais=('1', '2', '3'), qt=1):
+    dias = pd.date_range(inicio, fim, freq="D").strftime("%Y-%m-%d")
+    return [
+        {"id": i, "NUMPED": i, "DATA_PEDIDO": dia, "QT": qt, "CODFILIAL": filial}
+        for i, (dia, filial) in enumerate(((dia, filial) for dia in dias for filial in filiais), start=1)
+    ]
+
+
+@pytest.fixture
+def local(mocker, tmp_path):
+    mocker.patch.object(armazenamento, "DIRETORIO_PARQUET", str(tmp_path))
+    mocker.patch.object(sincronizacao, "sincronizar", return_value=pd.DataFrame())
+    armazenamento._travas.clear()
+    return tmp_path
+
+
+def test_mes_fechado_e_baixado_uma_vez(local, mocker):
+    baixar = mocker.patch.object(dados, "fetch_spec", side_effect=lambda spec, i, f: linhas(i, f))
+    primeiro = armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31))
+    segundo = armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31))
+
+    assert baixar.call_count == 1
+    assert len(primeiro) == len(segundo) == 31 * 3
+
+
+def test_so_as_pastas_das_filiais_pedidas_sao_lidas(local, mocker):
+    mocker.patch.object(dados, "fetch_spec", side_effect=lambda spec, i, f: linhas(i, f))
+    armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31))
+
+    lidos = []
+    ler = armazenamento.pq.read_table
+    mocker.patch.object(armazenamento.pq, "read_table",
+                        side_effect=lambda caminho, **kw: lidos.append(caminho) or ler(caminho, **kw))
+    df = armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31), filiais=['1', '3'])
+
+    assert sorted(df["CODFILIAL"].unique()) == ['1', '3']
+    assert len(lidos) == 2 and not any("filial=2" in caminho for caminho in lidos)
+
+
+def test_tabelas_diferentes_baixam_ao_mesmo_tempo(local, mocker):
+    # Cada download só termina quando o da outra tabela também começou (com uma trava única, esperaria para sempre)
+    encontro = threading.Barrier(2, timeout=5)
+
+    def baixar(spec, inicio, fim):
+        encontro.wait()
+        return linhas(inicio, fim)
+
+    mocker.patch.object(dados, "fetch_spec", side_effect=baixar)
+    resultados = {}
+
+    def carregar(tabela):
+        resultados[tabela] = armazenamento.carregar({**SPEC, "table": tabela}, date(2024, 3, 1), date(2024, 3, 31))
+
+    threads = [threading.Thread(target=carregar, args=(tabela,)) for tabela in ("PCPEDC", "PCPEDI")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {tabela: len(df) for tabela, df in resultados.items()} == {"PCPEDC": 93, "PCPEDI": 93}
+
+
+def test_invalidar_baixa_o_mes_de_novo(local, mocker):
+    baixar = mocker.patch.object(dados, "fetch_spec", side_effect=lambda spec, i, f: linhas(i, f, qt=1))
+    armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 4, 30))
+
+    # Correção no ERP depois da carência: o mês gravado continua igual até ser invalidado
+    baixar.side_effect = lambda spec, i, f: linhas(i, f, qt=2)
+    assert set(armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31))["QT"]) == {1}
+
+    armazenamento.invalidar(SPEC, date(2024, 3, 15))
+    marco = armazenamento.carregar(SPEC, date(2024, 3, 1), date(2024, 3, 31))
+    abril = armazenamento.carregar(SPEC, date(2024, 4, 1), date(2024, 4, 30))
+
+    assert set(marco["QT"]) == {2} and set(abril["QT"]) == {1}
+    assert baixar.call_args_list[-1].args[1:] == (date(2024, 3, 1), date(2024, 3, 31))
@@ -0,0 +1,103 @@
+import ast
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import dados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Colunas que cada página lê de cada consulta: (arquivo, variável da especificação, item da variável).
+# As páginas não são importadas (dependem de st_aggrid e plotly); as especificações são lidas do código.
+LIDAS = {
+    ("Página_Inicial.py", "CONSULTA_PCPEDC", None): ['NUMPED', 'DATA_PEDIDO', 'QT', 'PVENDA', 'CODFILIAL'],
+    ("Pedidos.py", "SUPABASE_TABLES", 0): ['DTFIMOS', 'CONFERENTE'],
+    ("Pedidos.py", "SUPABASE_TABLES", 1): ['DATA', 'DESCRICAO', 'L_COUNT', 'M_COUNT'],
+    ("Pedidos_Venda.py", "CONSULTA_PCPEDI", None): [
+        'NUMPED', 'NUMCAR', 'DATA', 'CODCLI', 'QT', 'CODPROD', 'PVENDA', 'POSICAO', 'CLIENTE', 'DESCRICAO',
+        'CODIGO_VEI', 'NOME_VENI', 'NUMNOTA', 'OBS', 'OBS1', 'OBS2', 'CODFILIAL', 'MUNICIPIO',
+    ],
+    ("Positivacao.py", "CONSULTA_PCVENDEDOR", None): [
+        'DATAPEDIDO', 'VALOR', 'QUANTIDADE', 'CODIGOVENDA', 'CODFORNECEDOR', 'CODPRODUTO', 'CUSTOPRODUTO',
+        'PEDIDO', 'CODUSUR', 'VENDEDOR', 'CODCLIENTE', 'ROTA', 'PRODUTO', 'CODFILIAL',
+    ],
+    ("Estoque.py", "SUPABASE_CONFIG", "estoque"): [
+        'CODFILIAL', 'CODPROD', 'QT_ESTOQUE', 'QTULTENT', 'DTULTENT', 'DTULTSAIDA', 'QTRESERV', 'QTINDENIZ',
+        'DTULTPEDCC', 'BLOQUEADA', 'NOME_PROD',
+    ],
+    ("Fornecedor.py", "SUPABASE_CONFIG", "estoque"): [
+        'CODFILIAL', 'CODPROD', 'QT_ESTOQUE', 'QTULTENT', 'DTULTENT', 'DTULTSAIDA', 'QTRESERV', 'QTINDENIZ',
+        'DTULTPEDCC', 'BLOQUEADA', 'NOME_PROD',
+    ],
+    ("vendas_produto.py", "CONSULTA_VWSOMELIER", None): [
+        'DESCRICAO_1', 'CODPROD', 'DATA', 'QT', 'PVENDA', 'VLCUSTOFIN', 'CODOPER',
+    ],
+    ("Vendedores.py", "CONSULTAS", "VWSOMELIER"): ['DATA', 'PVENDA', 'QT', 'NUMPED', 'CODPROD', 'DTCANCEL'],
+    ("Vendedores.py", "CONSULTAS", "PCVENDEDOR"): [
+        'DATAPEDIDO', 'PEDIDO', 'CODUSUR', 'VENDEDOR', 'CODCLIENTE', 'CLIENTE', 'FANTASIA', 'ROTA',
+        'QUANTIDADE', 'FORNECEDOR', 'PRODUTO', 'BLOQUEADO',
+    ],
+}
+
+# Módulos de apoio que leem as colunas pela página (o frame da consulta é passado a eles)
+DELEGADOS = {
+    "Página_Inicial.py": ["serie_diaria.py"],
+    "Positivacao.py": ["cubo_vendas.py"],
+}
+
+
+# Lê a especificação do código da página e devolve (especificação, código da página sem a atribuição dela
+# mais o dos seus módulos de apoio)
+def especificacao(arquivo, variavel, item):
+    with open(os.path.join(RAIZ, arquivo), encoding="utf-8") as f:
+        codigo = f.read()
+    for no in ast.parse(codigo).body:
+        if isinstance(no, ast.Assign) and any(getattr(alvo, "id", None) == variavel for alvo in no.targets):
+            valor = ast.literal_eval(no.value)
+            linhas = codigo.splitlines()
+            resto = "\n".join(linhas[:no.lineno - 1] + linhas[no.end_lineno:])
+            for modulo in DELEGADOS.get(arquivo, []):
+                with open(os.path.join(RAIZ, modulo), encoding="utf-8") as f:
+                    resto += f.read()
+            return (valor if item is None else valor[item]), resto
+    raise AssertionError(f"{variavel} não encontrada em {arquivo}")
+
+
+@pytest.mark.parametrize("pagina", list(LIDAS), ids=lambda p: f"{p[0]}:{p[1]}:{p[2]}")
+def test_especificacao_seleciona_as_colunas_que_a_pagina_le(pagina):
+    spec, _ = especificacao(*pagina)
+    assert not isinstance(spec["columns"], str), "a página precisa listar as colunas do select"
+    assert [col for col in LIDAS[pagina] if col not in spec["columns"]] == []
+    assert [col for col in spec.get("opcionais", []) if col not in spec["columns"]] == []
+
+
+# A lista acima só vale enquanto a página de fato lê cada coluna (fora da própria especificação; a coluna
+# de data pode ser lida pela chave "date_column")
+@pytest.mark.parametrize("pagina", list(LIDAS), ids=lambda p: f"{p[0]}:{p[1]}:{p[2]}")
+def test_colunas_lidas_aparecem_no_codigo_da_pagina(pagina):
+    spec, resto = especificacao(*pagina)
+    lidas = {col for col in LIDAS[pagina] if re.search(rf"""['"]{col}['"]""", resto)}
+    if '"date_column"' in resto:
+        lidas.add(spec.get("date_column"))
+    assert [col for col in LIDAS[pagina] if col not in lidas] == []
+
+
+def test_opcionais_so_entram_no_select_se_existirem(mocker):
+    amostra = mocker.patch.object(dados, "fetch", return_value=[{"id": 1, "DATA": None, "PRODUTO": "X"}])
+    dados.colunas_da_tabela.clear()
+    spec = {"table": "PCVENDEDOR", "columns": ['DATA', 'PRODUTO', 'BLOQUEADO'],
+            "opcionais": ['PRODUTO', 'BLOQUEADO'], "projeto": "vendedores"}
+
+    assert dados.compilar(spec)[0] == ['DATA', 'PRODUTO']
+    assert dados.colunas(spec) == ['DATA', 'PRODUTO']
+    amostra.assert_called_once_with("PCVENDEDOR", "*", range=(0, 0), projeto="vendedores")
+    dados.colunas_da_tabela.clear()
+
+
+def test_verificar_colunas_ignora_opcionais_ausentes():
+    spec = {"table": "VWSOMELIER", "columns": ['DATA', 'QT', 'DTCANCEL'], "opcionais": ['DTCANCEL']}
+
+    assert dados.verificar_colunas(spec, pd.DataFrame(columns=['DATA', 'QT'])) == []
+    assert dados.verificar_colunas(spec, pd.DataFrame(columns=['DATA'])) == ['QT']
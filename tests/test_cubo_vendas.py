@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cubo_vendas
+import esquemas
+import fornecedores
+from test_positivacao import comparar, legado_resumo, pedidos_brutos, pedidos_fixos
+
+
+def cubo_de(bruto):
+    return cubo_vendas.agregar(esquemas.aplicar("PCVENDEDOR", bruto))
+
+
+# Pedidos com a filial do pedido (igual em todas as suas linhas, como no ERP)
+def com_filial(bruto, semente):
+    pedidos = bruto['PEDIDO'].unique()
+    filial = pd.Series(np.random.default_rng(semente).choice(['1', '2', '3'], len(pedidos)), index=pedidos)
+    return bruto.assign(CODFILIAL=filial.loc[bruto['PEDIDO']].to_numpy())
+
+
+def legado(bruto):
+    return legado_resumo(bruto.assign(DATAPEDIDO=pd.to_datetime(bruto['DATAPEDIDO'])))
+
+
+def test_grao_do_cubo():
+    cubo = cubo_de(com_filial(pedidos_fixos(), 1))
+    assert list(cubo.columns) == cubo_vendas.CHAVES + cubo_vendas.METRICAS
+    assert not cubo.duplicated(subset=cubo_vendas.CHAVES).any()
+    assert set(cubo['CODFILIAL'].dropna()) <= {'1', '2', '3'}
+
+
+# Tabela sem CODFILIAL (coluna opcional fora do select): uma filial só
+def test_cubo_sem_coluna_de_filial():
+    cubo = cubo_de(pedidos_fixos())
+    assert set(cubo['CODFILIAL'].dropna()) == {cubo_vendas.SEM_FILIAL}
+    comparar(cubo_vendas.resumo_vendedores(cubo), legado(pedidos_fixos()))
+
+
+@pytest.mark.parametrize("semente", [1, 2])
+def test_resumo_por_filial_igual_ao_resumo_antigo_da_filial(semente):
+    bruto = com_filial(pedidos_brutos(semente), semente)
+    cubo = cubo_de(bruto)
+    comparar(cubo_vendas.resumo_vendedores(cubo), legado(bruto))
+    for filial in ['1', '2', '3']:
+        comparar(cubo_vendas.resumo_vendedores(cubo, filial), legado(bruto[bruto['CODFILIAL'] == filial]))
+
+
+def test_cubo_somado_entre_dias_igual_ao_cubo_do_periodo():
+    bruto = pedidos_brutos(3)
+    por_dia = pd.concat([cubo_de(do_dia) for _, do_dia in bruto.groupby('DATAPEDIDO')], ignore_index=True)
+    pd.testing.assert_frame_equal(
+        cubo_vendas.resumo_vendedores(por_dia), cubo_vendas.resumo_vendedores(cubo_de(bruto)), check_dtype=False
+    )
+    assert set(por_dia['FORNECEDOR'].dropna()) <= set(fornecedores.ORDEM) | {"7001", "7002"}
+
+
+# Blocos de dias como os de agregados (lacunas e carência) em cortes quaisquer: as duplicatas e os pedidos
+# bonificados de cada bloco bastam porque todas as linhas de um pedido são do mesmo dia
+@pytest.mark.parametrize("semente", [4, 5])
+def test_blocos_de_dias_quaisquer_iguais_ao_resumo_antigo(semente):
+    bruto = com_filial(pedidos_brutos(semente), semente)
+    dias = sorted(bruto['DATAPEDIDO'].unique())
+    cortes = sorted(np.random.default_rng(semente).choice(range(1, len(dias)), 4, replace=False))
+    blocos = np.split(np.array(dias), cortes)
+    cubo = pd.concat([cubo_de(bruto[bruto['DATAPEDIDO'].isin(bloco)]) for bloco in blocos], ignore_index=True)
+    comparar(cubo_vendas.resumo_vendedores(cubo), legado(bruto))
+
+
+# Sem a invariante, a linha repetida de um pedido em outro bloco é contada de novo e a bonificação de um
+# bloco não tira da venda as linhas do pedido no outro (o que o comentário do cubo documenta)
+def test_pedido_em_dois_blocos_e_agregado_em_cada_um():
+    bruto = pedidos_fixos()
+    ana = bruto[bruto['PEDIDO'] == 12].assign(DATAPEDIDO="2025-05-13")  # pedido bonificado em outro dia
+    bruto = pd.concat([bruto[bruto['PEDIDO'] != 12].iloc[[0]], ana.iloc[[1]], bruto[bruto['PEDIDO'] == 12].iloc[[0]]])
+    blocos = [bruto[bruto['DATAPEDIDO'] == dia] for dia in ("2025-05-12", "2025-05-13")]
+    resumo = cubo_vendas.resumo_vendedores(pd.concat([cubo_de(bloco) for bloco in blocos], ignore_index=True))
+    assert resumo.loc[0, 'TOTAL'] == 3 and resumo.loc[0, 'TOTAL_VENDIDO'] == pytest.approx(10 * 2 + 7)
@@ -0,0 +1,151 @@
+import pytest
+from postgrest.exceptions import APIError
+
+import dados
+
+TAMANHO_PAGINA = 1000
+
+
+COMPARACOES = {"gt": lambda a, b: a > b, "gte": lambda a, b: a >= b, "lt": lambda a, b: a < b}
+
+
+# Tabela falsa do PostgREST: filtros gt, ordenação pela chave e range; conta as linhas que o banco
+# percorre (offset pulado + linhas devolvidas; o filtro gt na chave indexada começa direto na página)
+class TabelaFalsa:
+    def __init__(self, n):
+        self.linhas = [{"id": i, "QT": i % 7} for i in range(1, n + 1)]
+        self.percorridas = 0
+        self.depois_da_pagina = None  # função chamada depois de cada página (gravações do ERP)
+
+    def fetch(self, table, columns="*", filters=None, order=None, range=None, projeto="principal"):
+        coluna_ordem, _, direcao = order.partition(".")
+        linhas = sorted(self.linhas, key=lambda linha: linha[coluna_ordem], reverse=direcao == "desc")
+        for coluna, operador, valor in filters or []:
+            linhas = [linha for linha in linhas if COMPARACOES[operador](linha[coluna], valor)]
+        pagina = linhas[range[0]:range[1] + 1]
+        self.percorridas += range[0] + len(pagina)
+        if self.depois_da_pagina:
+            self.depois_da_pagina(self)
+        return [dict(linha) for linha in pagina]
+
+    # Consulta montada sobre o cliente (dados._consulta), usada pela busca concorrente
+    def consulta(self, cliente, table, columns, filters, order):
+        return _ConsultaFalsa(self, table, columns, filters, order)
+
+    def contar(self, table, filters=None, projeto="principal"):
+        return sum(all(COMPARACOES[op](linha[col], valor) for col, op, valor in filters or []) for linha in self.linhas)
+
+
+class _ConsultaFalsa:
+    def __init__(self, tabela, table, columns, filters, order):
+        self.tabela, self.argumentos, self.intervalo = tabela, (table, columns, filters, order), None
+
+    def range(self, inicio, fim):
+        self.intervalo = (inicio, fim)
+        return self
+
+    def execute(self):
+        table, columns, filters, order = self.argumentos
+        return type("Resposta", (), {"data": self.tabela.fetch(table, columns, filters, order, self.intervalo)})()
+
+
+# Paginação por offset dos carregadores antigos (.range(offset, offset + 999) até a página vir incompleta)
+def carregar_offset(table, tamanho_pagina=TAMANHO_PAGINA):
+    linhas, inicio = [], 0
+    while True:
+        pagina = dados.fetch(table, "*", [], order="id", range=(inicio, inicio + tamanho_pagina - 1))
+        linhas.extend(pagina)
+        if len(pagina) < tamanho_pagina:
+            return linhas
+        inicio += tamanho_pagina
+
+
+@pytest.fixture
+def tabela(mocker):
+    def criar(n):
+        falsa = TabelaFalsa(n)
+        mocker.patch.object(dados, "fetch", side_effect=falsa.fetch)
+        mocker.patch.object(dados, "_consulta", side_effect=falsa.consulta)
+        mocker.patch.object(dados, "contar", side_effect=falsa.contar)
+        mocker.patch.object(dados, "obter_cliente", return_value=None)
+        return falsa
+    return criar
+
+
+def test_keyset_devolve_todas_as_linhas_uma_vez_em_ordem(tabela):
+    tabela(2500)
+    linhas = dados.fetch_keyset("VWSOMELIER", "*", chave="id")
+    assert [linha["id"] for linha in linhas] == list(range(1, 2501))
+
+
+def test_keyset_nao_perde_linhas_quando_o_erp_apaga_durante_a_carga(tabela):
+    # Depois da primeira página, o ERP apaga uma linha já lida: o offset desloca e pula uma linha ainda não lida
+    def apagar_uma_vez(falsa):
+        if any(linha["id"] == 10 for linha in falsa.linhas):
+            falsa.linhas = [linha for linha in falsa.linhas if linha["id"] != 10]
+
+    falsa = tabela(3000)
+    falsa.depois_da_pagina = apagar_uma_vez
+    por_offset = {linha["id"] for linha in carregar_offset("VWSOMELIER")}
+    assert 1001 not in por_offset
+
+    falsa = tabela(3000)
+    falsa.depois_da_pagina = apagar_uma_vez
+    por_chave = [linha["id"] for linha in dados.fetch_keyset("VWSOMELIER", "*", chave="id")]
+    assert por_chave == list(range(1, 3001))
+
+
+# Linhas percorridas pelo banco em função do tamanho da tabela: o keyset é linear (cada linha uma vez)
+# e o offset é quadrático (cada página pula todas as anteriores)
+@pytest.mark.parametrize("n", [10_000, 40_000, 160_000])
+def test_custo_keyset_linear_e_offset_quadratico(tabela, n):
+    falsa = tabela(n)
+    carregar_offset("VWSOMELIER")
+    offset = falsa.percorridas
+
+    falsa = tabela(n)
+    dados.fetch_keyset("VWSOMELIER", "*", chave="id")
+    keyset = falsa.percorridas
+
+    # n múltiplo da página: os dois terminam numa página vazia, que no offset ainda pula as n linhas
+    paginas = n // TAMANHO_PAGINA
+    assert keyset == n
+    assert offset == n * (paginas + 3) // 2
+
+
+def test_busca_concorrente_por_faixas_de_id_devolve_todas_as_linhas_em_ordem(tabela):
+    tabela(5500)
+    linhas = dados.fetch_paralelo("PCPEDC", ["QT"], chave="id")
+    assert [linha["id"] for linha in linhas] == list(range(1, 5501))
+
+
+def test_busca_concorrente_com_ids_esparsos_pagina_dentro_da_faixa(tabela):
+    # Ids agrupados: a faixa que cobre o bloco denso tem mais linhas que uma página
+    falsa = tabela(0)
+    ids = list(range(1, 301)) + list(range(100_000, 102_500))
+    falsa.linhas = [{"id": i, "QT": 1} for i in ids]
+    assert [linha["id"] for linha in dados.fetch_paralelo("PCPEDC", chave="id")] == ids
+
+
+def test_busca_concorrente_nao_perde_linhas_quando_o_erp_apaga_durante_a_carga(tabela):
+    def apagar_uma_vez(falsa):
+        falsa.linhas = [linha for linha in falsa.linhas if linha["id"] != 10]
+
+    falsa = tabela(6000)
+    falsa.depois_da_pagina = apagar_uma_vez
+    ids = [linha["id"] for linha in dados.fetch_paralelo("PCPEDC", chave="id")]
+    # Só a linha apagada pode faltar (se a faixa dela ainda não tinha sido lida); nenhuma outra se desloca
+    assert ids == sorted(set(ids))
+    assert set(range(1, 6001)) - set(ids) <= {10}
+
+
+# Só a função não instalada no banco troca a chamada rpc pela agregação local; os demais erros aparecem
+@pytest.mark.parametrize("erro, ausente", [
+    (APIError({"code": "PGRST202", "message": "Could not find the function"}), True),
+    (APIError({"code": 404, "message": "JSON could not be generated"}), True),
+    (APIError({"code": "57014", "message": "canceling statement due to statement timeout"}), False),
+    (APIError({"code": "PGRST301", "message": "JWT expired"}), False),
+    (TimeoutError("timeout"), False),
+])
+def test_funcao_ausente(erro, ausente):
+    assert dados.funcao_ausente(erro) is ausente
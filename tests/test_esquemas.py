@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import esquemas
+
+
+# Conversões que as páginas faziam antes do registro de esquemas (mesmas chamadas, por tabela)
+def _numeros(df, colunas, padrao=0):
+    for coluna in colunas:
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce').fillna(padrao)
+    return df
+
+
+def _datas(df, colunas, obrigatoria=False):
+    for coluna in colunas:
+        df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+    return df.dropna(subset=colunas).copy() if obrigatoria else df
+
+
+def legado_pcpedc(df):  # Página_Inicial.carregar_dados
+    return _numeros(_datas(df, ['DATA_PEDIDO'], obrigatoria=True), ['QT', 'PVENDA'])
+
+
+def legado_pcpedi(df):  # Pedidos_Venda.fetch_pedidos
+    df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
+    df['DATA'] = pd.to_datetime(df['DATA'], errors='coerce', format='%Y-%m-%d')
+    return _numeros(df, ['QT', 'PVENDA', 'NUMPED', 'NUMCAR', 'CODCLI', 'CODPROD'])
+
+
+def legado_pcvendedor(df):  # Positivacao.fetch_data + process_summary_data / year_month
+    df = _datas(df, ['DATAPEDIDO'], obrigatoria=True)
+    df = _numeros(df, ['VALOR', 'QUANTIDADE', 'CODFORNECEDOR', 'CODPRODUTO', 'CUSTOPRODUTO', 'CODCLIENTE'])
+    return _numeros(df, ['CODIGOVENDA'], padrao=1)
+
+
+def legado_vwsomelier(df):  # Estoque (QT), Fornecedor (PVENDA), Produto/Vendedores (DATA)
+    # VLCUSTOFIN não era convertido (Fornecedor convertia VL_CUSTOFIN, coluna que não existe)
+    return _numeros(_datas(df, ['DATA']), ['QT', 'PVENDA', 'VLCUSTOFIN'])
+
+
+def legado_estoque(df):  # Estoque/Fornecedor.fetch_estoque_data
+    df = _numeros(df, ['QTULTENT', 'QT_ESTOQUE', 'QTRESERV', 'QTINDENIZ', 'BLOQUEADA'])
+    return _datas(df, ['DTULTENT', 'DTULTSAIDA', 'DTULTPEDCC'])
+
+
+def legado_pcmovendpend(df):  # Pedidos.get_data_from_supabase
+    return _datas(df, ['DTFIMOS'], obrigatoria=True)
+
+
+def legado_pcpedc_posicao(df):  # Pedidos.get_data_from_supabase
+    return _numeros(_datas(df, ['DATA'], obrigatoria=True), ['L_COUNT', 'M_COUNT'])
+
+
+# Linhas brutas como o PostgREST devolve (JSON): textos numéricos, nulos, valores e datas inválidas
+BRUTOS = {
+    "PCPEDC": (legado_pcpedc, {
+        "DATA_PEDIDO": ["2025-05-13T10:00:00", None, "2025-05-14T08:30:00", "ontem"],
+        "QT": ["2", None, "abc", 4],
+        "PVENDA": [10.5, "3.25", None, ""],
+        "CODFILIAL": ["1", "2", None, "1"],
+    }),
+    "PCPEDI": (legado_pcpedi, {
+        "created_at": ["2025-05-13T10:00:00+00:00", None, "2025-05-13T11:00:00+00:00", "x"],
+        "DATA": ["2025-05-13", "13/05/2025", None, "2025-05-12"],
+        "QT": ["1", None, "abc", 2.5],
+        "PVENDA": [None, "9.90", 3, "-"],
+        "NUMPED": ["1001", None, "abc", 1003],
+        "NUMCAR": [None, "7", "", 7],
+        "CODCLI": ["55", "55", None, "x"],
+        "CODPROD": [10, "11", None, "?"],
+    }),
+    "PCVENDEDOR": (legado_pcvendedor, {
+        "DATAPEDIDO": ["2025-05-13", None, "2025-05-14", "2025-13-40"],
+        "VALOR": ["10.5", None, "abc", 3],
+        "QUANTIDADE": [1, "2", None, ""],
+        "CUSTOPRODUTO": [None, "1.5", 2, "x"],
+        "CODIGOVENDA": [None, "1", "abc", 2],
+        "CODFORNECEDOR": ["24", None, "x", 60],
+        "CODPRODUTO": [1, None, "2", "?"],
+        "CODCLIENTE": ["99", None, "abc", 100],
+    }),
+    "VWSOMELIER": (legado_vwsomelier, {
+        "DATA": ["2025-05-13", None, "2025-05-14", "sem data"],
+        "QT": ["3", None, "abc", 1],
+        "PVENDA": [None, "12.5", 4, ""],
+        "VLCUSTOFIN": ["8", None, 2.5, "x"],
+    }),
+    "ESTOQUE": (legado_estoque, {
+        "QT_ESTOQUE": ["5", None, "abc", -1],
+        "QTULTENT": [None, "10", 3, ""],
+        "QTRESERV": ["1", None, "x", 0],
+        "QTINDENIZ": [None, None, "2", 1],
+        "BLOQUEADA": ["0", "abc", None, 4],
+        "DTULTENT": ["2025-05-01", None, "2025-04-30", "x"],
+        "DTULTSAIDA": [None, "2025-05-02", "nunca", "2025-05-03"],
+        "DTULTPEDCC": ["2025-04-01", "2025-04-02", None, None],
+    }),
+    "PCMOVENDPEND": (legado_pcmovendpend, {
+        "DTFIMOS": ["2025-05-13T10:00:00", None, "x", "2025-05-13T12:15:00"],
+        "CONFERENTE": ["ANA", "BIA", None, "ANA"],
+    }),
+    "PCPEDC_POSICAO": (legado_pcpedc_posicao, {
+        "DATA": ["2025-05-13", "2025-05-14", None, "x"],
+        "L_COUNT": ["3", None, 1, "abc"],
+        "M_COUNT": [None, "2", "x", 5],
+    }),
+}
+
+
+@pytest.mark.parametrize("tabela", list(BRUTOS))
+def test_aplicar_igual_as_conversoes_das_paginas(tabela):
+    legado, bruto = BRUTOS[tabela]
+    esperado = legado(pd.DataFrame(bruto)).reset_index(drop=True)
+    textos = esperado.select_dtypes(object).columns
+    esperado[textos] = esperado[textos].where(esperado[textos].notna(), np.nan)  # None -> NaN, como nos textos Arrow
+    convertido = esquemas.aplicar(tabela, pd.DataFrame(bruto))
+
+    # Mesmos valores (os tipos mudam de propósito: inteiros e textos compactos)
+    pd.testing.assert_frame_equal(convertido, esperado, check_dtype=False)
+    for coluna, definicao in esquemas.ESQUEMAS[tabela].items():
+        if coluna not in convertido:
+            continue
+        if definicao["tipo"] == "data":
+            assert pd.api.types.is_datetime64_any_dtype(convertido[coluna])
+        elif "padrao" in definicao:
+            assert pd.api.types.is_numeric_dtype(convertido[coluna])
+            assert convertido[coluna].notna().all()
+
+
+def test_nulos_e_invalidos_viram_o_padrao_de_cada_coluna():
+    bruto = pd.DataFrame({
+        "DATAPEDIDO": ["2025-05-13"] * 3,
+        "CODIGOVENDA": [None, "abc", "2"],
+        "VALOR": [None, "abc", "2.5"],
+    })
+    convertido = esquemas.aplicar("PCVENDEDOR", bruto)
+    assert convertido["CODIGOVENDA"].tolist() == [1, 1, 2]
+    assert pd.api.types.is_integer_dtype(convertido["CODIGOVENDA"])
+    assert convertido["VALOR"].tolist() == [0.0, 0.0, 2.5]
+    assert convertido["VALOR"].dtype == np.float64
+
+
+def test_resultado_rpc_diario():
+    bruto = pd.DataFrame({
+        "DATA_PEDIDO": ["2025-05-13", None, "2025-05-14"],
+        "CODFILIAL": ["1", "2", None],
+        "VLTOTAL": ["10.5", 3, None],
+        "PEDIDOS": [2, None, "x"],
+        "LINHAS": [None, 4, 5],
+    })
+    convertido = esquemas.aplicar("kpi_pcpedc_diario", bruto)
+    assert len(convertido) == 2  # DATA_PEDIDO obrigatória
+    assert convertido["CODFILIAL"].tolist()[0] == "1" and pd.isna(convertido["CODFILIAL"].iloc[1])
+    assert convertido["VLTOTAL"].tolist() == [10.5, 0.0]
+    assert convertido["PEDIDOS"].tolist() == [2, 0]
+    assert convertido["LINHAS"].tolist() == [0, 5]
+
+
+def test_aplicar_de_novo_nao_muda_o_frame():
+    _, bruto = BRUTOS["PCVENDEDOR"]
+    convertido = esquemas.aplicar("PCVENDEDOR", pd.DataFrame(bruto))
+    pd.testing.assert_frame_equal(esquemas.aplicar("PCVENDEDOR", convertido), convertido)
+
+
+def test_textos_repetidos_viram_category_e_os_demais_strings_arrow():
+    n = 10 * esquemas.LIMITE_CATEGORIA
+    df = esquemas.compactar(pd.DataFrame({
+        "VENDEDOR": ["ANA", "BRUNO", None, "ANA", "CARLA"] * (n // 5),
+        "OBS": [f"obs {i}" for i in range(n)],
+    }))
+    assert isinstance(df["VENDEDOR"].dtype, pd.CategoricalDtype)
+    assert df["VENDEDOR"].isna().sum() == n // 5
+    assert df["OBS"].dtype == esquemas.TEXTO_COMPACTO
+
+
+def test_groupby_das_categorias_so_traz_os_grupos_presentes():
+    df = esquemas.compactar(pd.DataFrame({"VENDEDOR": ["ANA", "BRUNO"] * 50, "VALOR": [1.0] * 100}))
+    so_ana = df[df["VENDEDOR"] == "ANA"]
+    assert so_ana.groupby("VENDEDOR", observed=True)["VALOR"].sum().to_dict() == {"ANA": 50.0}
+
+
+def test_relatorio_mostra_a_ultima_compactacao_sem_acumular(monkeypatch):
+    monkeypatch.setattr(esquemas, "_economia", {})
+    _, bruto = BRUTOS["PCVENDEDOR"]
+    esquemas.aplicar("PCVENDEDOR", pd.DataFrame(bruto))
+    primeiro = esquemas.relatorio()
+    for _ in range(5):
+        esquemas.aplicar("PCVENDEDOR", pd.DataFrame(bruto))
+    pd.testing.assert_frame_equal(esquemas.relatorio(), primeiro)
+
+    # Frames já compactados (recarga da página sobre o estado sincronizado) não mexem no relatório
+    esquemas.aplicar("PCVENDEDOR", esquemas.aplicar("PCVENDEDOR", pd.DataFrame(bruto)).iloc[:1])
+    pd.testing.assert_frame_equal(esquemas.relatorio(), primeiro)
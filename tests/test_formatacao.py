@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import formatacao
+
+
+# Formatação linha a linha das páginas (Positivacao.formatar_valor)
+def formatar_valor(valor):
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# Valores difíceis para o arredondamento a centavos: meios centavos, erros de representação (1.005,
+# 2.675), negativos, zero negativo, milhares, valores grandes, NaN e infinitos
+VALORES = [0.0, -0.0, 0.005, 0.015, 0.125, 1.005, 2.675, 1234.565, -1234.565, 999.995, 1_000_000.0,
+           -0.001, 123456789.987, 9.999e12, np.nan, np.inf, -np.inf]
+
+
+@pytest.fixture
+def valores():
+    rng = np.random.default_rng(3)
+    aleatorios = np.concatenate([np.round(rng.random(2000) * 1000, 3), rng.normal(0, 1e6, 2000)])
+    return pd.Series(np.concatenate([VALORES, aleatorios]), index=np.arange(4017) * 2)
+
+
+def test_moeda_igual_a_formatar_valor(valores):
+    formatado = formatacao.moeda(valores)
+    assert formatado.index.equals(valores.index)
+    assert formatado.tolist() == [formatar_valor(valor) for valor in valores]
+
+
+def test_percentual_igual_a_formatacao_do_python(valores):
+    assert formatacao.percentual(valores).tolist() == [f"{valor:.2f}%" for valor in valores]
+
+
+def test_arrays_sem_indice_e_vazios():
+    assert formatacao.moeda(np.array([1.5, 1.5])).tolist() == ["R$ 1,50", "R$ 1,50"]
+    assert formatacao.percentual(pd.Series([], dtype=float)).tolist() == []
@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import dados
+import esquemas
+import gerenciador_cache
+import sincronizacao
+from Pedidos_Venda import CONSULTA_PCPEDI, fetch_pedidos
+
+# Sessões simultâneas nos testes de concorrência
+SESSOES = 8
+
+
+# Redis falso em memória: SET com PX, GET e PTTL em pipeline (o que a camada L2 usa)
+class RedisFalso:
+    def __init__(self):
+        self.valores = {}
+        self.validades = {}
+
+    def set(self, chave, valor, px=None):
+        assert isinstance(valor, bytes)
+        self.valores[chave] = valor
+        self.validades[chave] = px
+        return True
+
+    def get(self, chave):
+        return self.valores.get(chave)
+
+    def pttl(self, chave):
+        return self.validades.get(chave, -2) if chave in self.valores else -2
+
+    def pipeline(self):
+        return _PipelineFalso(self)
+
+
+class _PipelineFalso:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.comandos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def get(self, chave):
+        self.comandos.append(lambda: self.cliente.get(chave))
+        return self
+
+    def pttl(self, chave):
+        self.comandos.append(lambda: self.cliente.pttl(chave))
+        return self
+
+    def execute(self):
+        return [comando() for comando in self.comandos]
+
+
+@pytest.fixture
+def redis_falso(mocker):
+    gerenciador_cache._namespaces.clear()
+    falso = RedisFalso()
+    mocker.patch.object(gerenciador_cache, "_redis", return_value=falso)
+    yield falso
+    gerenciador_cache._namespaces.clear()
+
+
+# Frame como os das páginas depois de esquemas.aplicar: textos Arrow, códigos int32, datas e valores
+def frame_compacto(n=1000):
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "CODUSUR": rng.integers(1, 60, n),
+        "VENDEDOR": [f"VENDEDOR {i % 60}" for i in range(n)],
+        "CODCLIENTE": rng.integers(1, 100_000, n),
+        "DATAPEDIDO": pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 30, n), unit="D"),
+        "VALOR": rng.random(n) * 100,
+        "OBSERVACAO": [None if i % 7 == 0 else f"obs {i}" for i in range(n)],
+    })
+    return esquemas.compactar(df)
+
+
+def test_frame_compacto_tem_os_tipos_do_esquema():
+    df = frame_compacto()
+    assert isinstance(df["VENDEDOR"].dtype, pd.CategoricalDtype)
+    assert df["OBSERVACAO"].dtype == esquemas.TEXTO_COMPACTO
+    assert df["CODUSUR"].dtype == np.int32
+    assert df["OBSERVACAO"].isna().sum() > 0
+
+
+def test_ida_e_volta_pelo_redis_preserva_valores_e_tipos(redis_falso):
+    df = frame_compacto()
+    gerenciador_cache.gravar("vendedores", "chave", df)
+    assert len(redis_falso.valores) == 1
+
+    # Outro processo: L1 vazio, o valor vem do Redis
+    gerenciador_cache.limpar("vendedores")
+    lido = gerenciador_cache.obter("vendedores", "chave")
+    assert_frame_equal(lido, df)
+    assert gerenciador_cache.estatisticas()["vendedores"]["acertos_l2"] == 1
+
+    # O L1 foi aquecido com o valor lido
+    assert gerenciador_cache.obter("vendedores", "chave") is lido
+
+
+def test_serializacao_preserva_frames_de_objetos_como_tipos_compactos():
+    df = pd.DataFrame({"NOME": ["a", None, "c"], "CODIGO": [1, 2, 3], "VALOR": [1.5, np.nan, 3.0]})
+    lido = gerenciador_cache.desserializar(gerenciador_cache.serializar(df))
+    assert_frame_equal(lido, esquemas.compactar(df))
+
+
+def test_ttl_restante_do_redis_vira_frescor_no_l1(redis_falso):
+    gerenciador_cache.gravar("vendedores", "chave", frame_compacto(10), ttl=30)
+    assert redis_falso.validades["cobata:v1:vendedores:chave"] == 30_000
+
+
+def test_falha_no_redis_devolve_o_padrao(redis_falso):
+    gerenciador_cache.limpar("vendedores")
+    assert gerenciador_cache.obter("vendedores", "ausente", "padrao") == "padrao"
+    assert gerenciador_cache.estatisticas()["vendedores"]["falhas_l2"] == 1
+
+
+def test_namespace_so_em_memoria_nao_vai_ao_redis(redis_falso):
+    gerenciador_cache.gravar("positivacao_processado", "chave", frame_compacto(10))
+    assert redis_falso.valores == {}
+
+
+def test_dicionario_de_frames_vai_ao_redis_e_volta(redis_falso):
+    valor = {"PCMOVENDPEND": frame_compacto(50), "PCPEDC_POSICAO": frame_compacto(20), "VAZIA": pd.DataFrame()}
+    gerenciador_cache.gravar("pedidos", "chave", valor)
+    assert len(redis_falso.valores) == 1
+
+    gerenciador_cache.limpar("pedidos")
+    lido = gerenciador_cache.obter("pedidos", "chave")
+    assert list(lido) == list(valor)
+    for tabela in ["PCMOVENDPEND", "PCPEDC_POSICAO"]:
+        assert_frame_equal(lido[tabela], valor[tabela])
+    assert lido["VAZIA"].empty
+
+
+# Dicionários, listas e tuplas contam a memória dos frames que guardam (não só o objeto do contêiner)
+def test_tamanho_soma_os_frames_dos_conteineres():
+    a, b = frame_compacto(1000), frame_compacto(500)
+    frames = gerenciador_cache.tamanho(a) + gerenciador_cache.tamanho(b)
+    for valor in ({"a": a, "b": b}, [a, b], (a, {"b": b})):
+        assert frames < gerenciador_cache.tamanho(valor) < frames + 4096
+
+
+def test_dicionario_maior_que_o_orcamento_nao_fica_no_l1(mocker):
+    gerenciador_cache._namespaces.clear()
+    mocker.patch.dict(gerenciador_cache.NAMESPACES, {"pedidos": {"max_bytes": 50_000, "ttl": 60, "obsoleto": 0, "l2": False}})
+    gerenciador_cache.gravar("pedidos", "grande", {"A": frame_compacto(2000), "B": frame_compacto(2000)})
+    assert gerenciador_cache.estatisticas()["pedidos"]["entradas"] == 0
+    gerenciador_cache._namespaces.clear()
+
+
+@pytest.fixture
+def cache_local(mocker):
+    gerenciador_cache._namespaces.clear()
+    gerenciador_cache.limpar(sincronizacao.NAMESPACE)
+    mocker.patch.object(gerenciador_cache, "_redis", return_value=None)
+    yield
+    gerenciador_cache._namespaces.clear()
+    gerenciador_cache.limpar(sincronizacao.NAMESPACE)
+
+
+# Função para chamar `funcao` de SESSOES threads liberadas ao mesmo tempo (sessões do Streamlit)
+def em_sessoes(funcao):
+    largada = threading.Barrier(SESSOES)
+    resultados = [None] * SESSOES
+
+    def sessao(i):
+        largada.wait()
+        resultados[i] = funcao()
+
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(SESSOES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+
+# Supabase lento: cada busca demora o bastante para todas as sessões chegarem com a carga em andamento
+def supabase_lento(table, columns="*", filters=None, chave="id", projeto="principal", **_):
+    time.sleep(0.2)
+    return [{
+        "id": 1, "created_at": "2025-05-13T10:00:00", "NUMPED": 1, "NUMCAR": 0, "DATA": "2025-05-13",
+        "CODCLI": 5, "QT": 2, "CODPROD": 10, "PVENDA": 3.5, "POSICAO": "L", "CLIENTE": "CLIENTE",
+        "DESCRICAO": "PRODUTO", "CODIGO_VEI": None, "NOME_VENI": None, "NUMNOTA": None, "OBS": None,
+        "OBS1": None, "OBS2": None, "CODFILIAL": "1", "MUNICIPIO": "CIDADE", "TABELA": table,
+    }]
+
+
+def test_cargas_frias_simultaneas_da_pagina_fazem_uma_busca(cache_local, mocker):
+    busca = mocker.patch.object(dados, "fetch_paralelo", side_effect=supabase_lento)
+    resultados = em_sessoes(lambda: fetch_pedidos(date(2025, 5, 13), date(2025, 5, 13)))
+
+    assert busca.call_count == 1
+    assert busca.call_args.args[0] == CONSULTA_PCPEDI["table"]
+    for df in resultados:
+        assert_frame_equal(df, resultados[0])
+    assert resultados[0]["valor_total"].tolist() == [7.0]
+    assert gerenciador_cache.estatisticas()["pedidos_venda"]["coalescidas"] >= 1
+
+
+def test_cargas_frias_simultaneas_fazem_uma_busca_por_tabela(cache_local, mocker):
+    busca = mocker.patch.object(dados, "fetch_paralelo", side_effect=supabase_lento)
+
+    @gerenciador_cache.em_cache("pedidos")
+    def carregar_pedidos():
+        return {tabela: pd.DataFrame(dados.fetch_paralelo(tabela)) for tabela in ["PCPEDC", "PCPEDI"]}
+
+    em_sessoes(carregar_pedidos)
+    assert Counter(chamada.args[0] for chamada in busca.call_args_list) == {"PCPEDC": 1, "PCPEDI": 1}
+
+
+def test_chave_obsoleta_tem_uma_atualizacao_em_segundo_plano(cache_local):
+    antigo = pd.DataFrame({"VALOR": [1]})
+    novo = pd.DataFrame({"VALOR": [2]})
+    gerenciador_cache.gravar("pedidos_venda", "chave", antigo, ttl=0)
+
+    # A atualização fica presa até todas as sessões receberem o valor antigo
+    liberar = threading.Event()
+    cargas = []
+
+    def carregar():
+        cargas.append(1)
+        liberar.wait(5)
+        return novo
+
+    resultados = em_sessoes(lambda: gerenciador_cache.obter_ou_carregar("pedidos_venda", "chave", carregar))
+    assert all(df is antigo for df in resultados)
+
+    liberar.set()
+    for _ in range(100):
+        if gerenciador_cache.estatisticas()["pedidos_venda"]["atualizacoes"]:
+            break
+        time.sleep(0.05)
+    assert len(cargas) == 1
+    assert gerenciador_cache.estatisticas()["pedidos_venda"]["atualizacoes"] == 1
+    assert gerenciador_cache.obter("pedidos_venda", "chave") is novo
+
+
+# Estado da sincronização no orçamento do namespace: conta o frame guardado e sai pelo LRU
+def test_estados_da_sincronizacao_respeitam_o_orcamento(cache_local, mocker):
+    mocker.patch.object(dados, "fetch_spec", side_effect=lambda spec, i, f: supabase_lento(spec["table"]) * 2000)
+    df = sincronizacao.sincronizar(CONSULTA_PCPEDI, "2025-05-13", "2025-05-13")
+    ocupado = gerenciador_cache.estatisticas()["sincronizacao"]["bytes"]
+    assert ocupado >= gerenciador_cache.tamanho(df)
+
+    gerenciador_cache._namespaces.clear()
+    mocker.patch.dict(gerenciador_cache.NAMESPACES, {"sincronizacao": {**gerenciador_cache.NAMESPACES["sincronizacao"],
+                                                                         "max_bytes": int(ocupado * 1.5)}})
+    for dia in ["2025-05-12", "2025-05-13"]:
+        sincronizacao.sincronizar(CONSULTA_PCPEDI, dia, dia)
+    estatisticas = gerenciador_cache.estatisticas()["sincronizacao"]
+    assert estatisticas["entradas"] == 1 and estatisticas["expulsoes"] == 1
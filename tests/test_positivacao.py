@@ -0,0 +1,195 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cubo_vendas
+import esquemas
+import fornecedores
+
+# Dados das funções antigas da página (os mesmos da dimensão de fornecedores)
+PRODUTOS_BRITVIC = list(fornecedores.REATRIBUICOES)
+DIAS_SEMANA = {
+    "SEGUNDA": 0, "TERCA": 1, "TERÇA": 1, "QUARTA": 2, "QUINTA": 3,
+    "SEXTA": 4, "SABADO": 5, "SÁBADO": 5, "DOMINGO": 6
+}
+
+
+# Verificação antiga de rota, linha a linha (Positivacao.is_pedido_dentro_rota)
+def legado_dentro_rota(dia_pedido, rota):
+    try:
+        dia_pedido_num = pd.to_datetime(dia_pedido).weekday()
+        rota = rota.upper() if isinstance(rota, str) else ""
+        if rota in DIAS_SEMANA:
+            return dia_pedido_num == DIAS_SEMANA[rota]
+        return False
+    except:  # noqa: E722
+        return False
+
+
+# Resumo antigo da página (Positivacao.process_summary_data) até antes da formatação em texto
+def legado_resumo(df):
+    df = df.drop_duplicates(subset=['PEDIDO', 'CODPRODUTO']).copy()
+    df.loc[df['CODPRODUTO'].isin(PRODUTOS_BRITVIC), 'CODFORNECEDOR'] = fornecedores.BRITVIC_TEMP_CODE
+    df['FORNECEDOR'] = df['CODFORNECEDOR'].map(fornecedores.NOMES).fillna(df['CODFORNECEDOR'].astype(str))
+    df['DENTRO_ROTA'] = df.apply(lambda row: legado_dentro_rota(row['DATAPEDIDO'], row['ROTA']), axis=1)
+
+    chaves = ['CODUSUR', 'VENDEDOR']
+    pedidos_dentro_rota = df[df['DENTRO_ROTA']].groupby(chaves)['PEDIDO'].nunique().reset_index(name='PEDIDOS_DENTRO_ROTA')
+    pedidos_fora_rota = df[~df['DENTRO_ROTA']].groupby(chaves)['PEDIDO'].nunique().reset_index(name='PEDIDOS_FORA_ROTA')
+    earliest_date = df.groupby(chaves)['DATAPEDIDO'].min().reset_index()
+    pedidos_bonific = df[df['CODIGOVENDA'] != 1].groupby(chaves)['PEDIDO'].nunique().reset_index(name='PEDIDOS_COM_BONIFICACAO')
+
+    bonified_pedidos = df[df['CODIGOVENDA'] != 1]['PEDIDO'].unique()
+    df_non_bonific = df[~df['PEDIDO'].isin(bonified_pedidos)].copy()
+    df_non_bonific['TOTAL_ROW_VENDA'] = df_non_bonific['VALOR'] * df_non_bonific['QUANTIDADE']
+    df_non_bonific['TOTAL_ROW_CUSTO'] = df_non_bonific['CUSTOPRODUTO'] * df_non_bonific['QUANTIDADE']
+    total_vendido = df_non_bonific.groupby(chaves)['TOTAL_ROW_VENDA'].sum().reset_index(name='TOTAL_VENDIDO')
+    total_custo = df_non_bonific.groupby(chaves)['TOTAL_ROW_CUSTO'].sum().reset_index(name='TOTAL_CUSTO')
+
+    df_positivacao = df[df['CODFORNECEDOR'].isin(fornecedores.NOMES.keys()) | df['CODPRODUTO'].isin(PRODUTOS_BRITVIC)]
+    positivacao = df_positivacao.groupby(chaves + ['DATAPEDIDO', 'FORNECEDOR'])['CODCLIENTE'].nunique().reset_index(name='POSITIVACAO')
+    positivacao = positivacao.groupby(chaves + ['FORNECEDOR'])['POSITIVACAO'].sum().reset_index()
+    positivacao_pivot = positivacao.pivot_table(
+        index=chaves, columns='FORNECEDOR', values='POSITIVACAO', aggfunc='sum', fill_value=0
+    ).reset_index()
+    for supplier in fornecedores.ORDEM:
+        if supplier not in positivacao_pivot.columns:
+            positivacao_pivot[supplier] = 0
+    positivacao_pivot = positivacao_pivot[chaves + fornecedores.ORDEM]
+
+    result = pedidos_bonific.merge(total_vendido, on=chaves, how='outer')
+    result = result.merge(total_custo, on=chaves, how='outer')
+    result = result.merge(positivacao_pivot, on=chaves, how='outer')
+    result = result.merge(pedidos_dentro_rota, on=chaves, how='outer')
+    result = result.merge(pedidos_fora_rota, on=chaves, how='outer')
+    result = result.merge(earliest_date, on=chaves, how='outer')
+
+    result['TOTAL'] = result['PEDIDOS_DENTRO_ROTA'].fillna(0) + result['PEDIDOS_FORA_ROTA'].fillna(0)
+    result['MARKUP_TOTAL'] = ((result['TOTAL_VENDIDO'] - result['TOTAL_CUSTO']) / result['TOTAL_CUSTO'] * 100).round(2)
+    result['MARGEM_TOTAL'] = ((result['TOTAL_VENDIDO'] - result['TOTAL_CUSTO']) / result['TOTAL_VENDIDO'] * 100).round(2)
+    result['MARKUP_TOTAL'] = result['MARKUP_TOTAL'].replace([float('inf'), -float('inf')], 0).fillna(0)
+    result['MARGEM_TOTAL'] = result['MARGEM_TOTAL'].replace([float('inf'), -float('inf')], 0).fillna(0)
+    return result.fillna(0)
+
+
+# Pedidos de PCVENDEDOR como vêm do Supabase: vendedores com rotas válidas, inválidas e nulas, fornecedores
+# acompanhados e não acompanhados, produtos BRITVIC, pedidos bonificados e linhas repetidas. Como no ERP,
+# data, vendedor, rota e cliente são do pedido (iguais em todas as suas linhas)
+def pedidos_brutos(semente, n=3000):
+    rng = np.random.default_rng(semente)
+    vendedores = [(1, "ANA"), (2, "BRUNO"), (3, "CARLA"), (4, "DIEGO"), (5, None), (6, "FABIO")]
+    rotas = ["SEGUNDA", "terça", "QUARTA", "QUINTA", "SEXTA", "SÁBADO", "DOMINGO", "FERIADO", None]
+    codigos = list(fornecedores.NOMES)[:8] + [7001, 7002]
+    produtos = PRODUTOS_BRITVIC[:5] + list(range(10, 40))
+    dias = pd.date_range("2025-05-01", "2025-05-21").strftime("%Y-%m-%dT00:00:00")
+    pedido = rng.integers(1000, 1000 + n // 4, n)
+    vendedor = rng.integers(0, len(vendedores), n)
+    rota_vendedor = rng.integers(0, len(rotas), len(vendedores))
+    bruto = pd.DataFrame({
+        "DATAPEDIDO": dias[rng.integers(0, len(dias), n)],
+        "VALOR": np.round(rng.random(n) * 50, 2),
+        "QUANTIDADE": rng.integers(1, 12, n),
+        "CODIGOVENDA": np.where(rng.random(n) < 0.03, 5, 1),
+        "CODFORNECEDOR": np.array(codigos)[rng.integers(0, len(codigos), n)],
+        "CODPRODUTO": np.array(produtos)[rng.integers(0, len(produtos), n)],
+        "CUSTOPRODUTO": np.round(rng.random(n) * 40, 2),
+        "PEDIDO": pedido,
+        "CODUSUR": [vendedores[v][0] for v in vendedor],
+        "VENDEDOR": [vendedores[v][1] for v in vendedor],
+        "CODCLIENTE": rng.integers(1, 60, n),
+        "ROTA": [rotas[rota_vendedor[v]] if rng.random() > 0.1 else rotas[rng.integers(0, len(rotas))] for v in vendedor],
+    })
+    do_pedido = ['DATAPEDIDO', 'CODUSUR', 'VENDEDOR', 'ROTA', 'CODCLIENTE']
+    primeira = bruto.drop_duplicates('PEDIDO').set_index('PEDIDO')[do_pedido]
+    bruto = bruto.assign(**primeira.loc[bruto['PEDIDO']].reset_index(drop=True))
+    return pd.concat([bruto, bruto.sample(frac=0.05, random_state=semente)], ignore_index=True)
+
+
+# Resumo novo: como na página, o cubo de vendas do período e o resumo por vendedor lido dele
+def resumo_novo(bruto):
+    return cubo_vendas.resumo_vendedores(cubo_vendas.agregar(esquemas.aplicar("PCVENDEDOR", bruto)))
+
+
+def comparar(novo, legado):
+    colunas = ['CODUSUR', 'VENDEDOR', 'DATAPEDIDO', 'PEDIDOS_DENTRO_ROTA', 'PEDIDOS_FORA_ROTA', 'TOTAL',
+               'PEDIDOS_COM_BONIFICACAO', 'TOTAL_VENDIDO', 'TOTAL_CUSTO', 'MARKUP_TOTAL', 'MARGEM_TOTAL'] + fornecedores.ORDEM
+    novo = novo[colunas].sort_values(['CODUSUR', 'VENDEDOR']).reset_index(drop=True)
+    legado = legado[colunas].sort_values(['CODUSUR', 'VENDEDOR']).reset_index(drop=True)
+    novo['VENDEDOR'] = novo['VENDEDOR'].astype(object)
+    pd.testing.assert_frame_equal(novo, legado, check_dtype=False, check_exact=False, rtol=1e-9)
+
+
+@pytest.fixture(autouse=True)
+def sem_avisos_do_legado():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        yield
+
+
+@pytest.mark.parametrize("semente", [1, 2, 3])
+def test_rota_vetorizada_igual_a_verificacao_linha_a_linha(semente):
+    bruto = pedidos_brutos(semente)
+    df = esquemas.aplicar("PCVENDEDOR", bruto)
+    legado = [legado_dentro_rota(dia, rota) for dia, rota in zip(df['DATAPEDIDO'], bruto['ROTA'])]
+    assert cubo_vendas.dentro_da_rota(df['DATAPEDIDO'], df['ROTA']).tolist() == legado
+
+
+@pytest.mark.parametrize("semente", [1, 2, 3])
+def test_resumo_novo_igual_ao_process_summary_data_antigo(semente):
+    bruto = pedidos_brutos(semente)
+    legado = legado_resumo(bruto.assign(DATAPEDIDO=pd.to_datetime(bruto['DATAPEDIDO'])))
+    comparar(resumo_novo(bruto), legado)
+
+
+# Pedidos montados à mão (12/05/2025 é segunda-feira): ANA tem rota de segunda, BRUNO de sábado
+def pedidos_fixos():
+    linhas = [
+        # DATAPEDIDO, PEDIDO, CODUSUR, VENDEDOR, ROTA, CODCLIENTE, CODFORNECEDOR, CODPRODUTO, CODIGOVENDA, VALOR, QT, CUSTO
+        ("2025-05-12", 10, 1, "ANA", "SEGUNDA", 100, 99678, 11, 1, 10.0, 2, 6.0),  # JTI, dentro da rota
+        ("2025-05-12", 10, 1, "ANA", "SEGUNDA", 100, 7001, 2798, 1, 5.0, 1, 4.0),  # produto BRITVIC
+        ("2025-05-12", 10, 1, "ANA", "SEGUNDA", 100, 7001, 2798, 1, 5.0, 1, 4.0),  # linha repetida
+        ("2025-05-13", 11, 1, "ANA", "SEGUNDA", 101, 99678, 11, 1, 10.0, 1, 6.0),  # JTI, fora da rota
+        ("2025-05-12", 12, 1, "ANA", "SEGUNDA", 100, 99678, 12, 5, 8.0, 3, 5.0),  # bonificado, mesmo cliente
+        ("2025-05-12", 12, 1, "ANA", "SEGUNDA", 100, 5832, 13, 1, 7.0, 1, 3.0),  # PMB no pedido bonificado
+        ("2025-05-17", 20, 2, "BRUNO", "sábado", 200, 7001, 14, 1, 20.0, 1, 10.0),  # não acompanhado, dentro
+        ("2025-05-17", 21, 2, "BRUNO", None, 201, 5065, 15, 1, 4.0, 5, 4.0),  # SEDAS, sem rota
+        ("2025-05-18", 22, 2, "BRUNO", "sábado", 201, 6521, 16, 1, 4.0, 1, 5.0),  # SEDAS (outro código)
+    ]
+    colunas = ["DATAPEDIDO", "PEDIDO", "CODUSUR", "VENDEDOR", "ROTA", "CODCLIENTE", "CODFORNECEDOR",
+               "CODPRODUTO", "CODIGOVENDA", "VALOR", "QUANTIDADE", "CUSTOPRODUTO"]
+    return pd.DataFrame(linhas, columns=colunas)
+
+
+def test_resumo_dos_pedidos_fixos():
+    resumo = resumo_novo(pedidos_fixos()).set_index("VENDEDOR")
+
+    assert resumo.loc["ANA", ["PEDIDOS_DENTRO_ROTA", "PEDIDOS_FORA_ROTA", "TOTAL"]].tolist() == [2, 1, 3]
+    assert resumo.loc["BRUNO", ["PEDIDOS_DENTRO_ROTA", "PEDIDOS_FORA_ROTA", "TOTAL"]].tolist() == [1, 2, 3]
+    assert resumo["PEDIDOS_COM_BONIFICACAO"].tolist() == [1, 0]
+
+    # O pedido 12 (bonificado) sai da venda e do custo inteiro, inclusive a linha PMB sem bonificação
+    assert resumo.loc["ANA", "TOTAL_VENDIDO"] == pytest.approx(10 * 2 + 5 + 10)
+    assert resumo.loc["ANA", "TOTAL_CUSTO"] == pytest.approx(6 * 2 + 4 + 6)
+    assert resumo.loc["BRUNO", "TOTAL_VENDIDO"] == pytest.approx(20 + 20 + 4)
+    assert resumo.loc["BRUNO", "MARKUP_TOTAL"] == pytest.approx(round((44 - 35) / 35 * 100, 2))
+
+    # Positivação: clientes distintos por dia e fornecedor, somados por vendedor (bonificados contam)
+    matriz = resumo[fornecedores.ORDEM]
+    assert matriz.loc["ANA"][lambda linha: linha > 0].to_dict() == {"JTI": 2, "PMB": 1, "BRITVIC": 1}
+    assert matriz.loc["BRUNO"][lambda linha: linha > 0].to_dict() == {"SEDAS": 2}
+
+
+def test_pedidos_fixos_iguais_ao_resumo_antigo():
+    bruto = pedidos_fixos()
+    comparar(resumo_novo(bruto), legado_resumo(bruto.assign(DATAPEDIDO=pd.to_datetime(bruto["DATAPEDIDO"]))))
+
+
+def test_vendedor_so_com_pedidos_bonificados_tem_venda_e_markup_zerados():
+    bruto = pedidos_fixos().assign(CODIGOVENDA=5)
+    resumo = resumo_novo(bruto)
+    assert resumo["TOTAL_VENDIDO"].tolist() == [0, 0]
+    assert resumo["MARKUP_TOTAL"].tolist() == [0, 0]
+    assert resumo["PEDIDOS_COM_BONIFICACAO"].tolist() == [3, 3]
+    comparar(resumo, legado_resumo(bruto.assign(DATAPEDIDO=pd.to_datetime(bruto["DATAPEDIDO"]))))
@@ -0,0 +1,142 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import esquemas
+import serie_diaria
+
+HOJE = date(2025, 5, 14)
+
+
+# Cálculos da Página Inicial antes da série diária (cópia da versão original, sobre o frame completo de PCPEDC)
+def calcular_faturamento(data, hoje, ontem, semana_inicial, semana_passada_inicial):
+    faturamento_hoje = data[data['DATA_PEDIDO'].dt.date == hoje.date()]['VLTOTAL'].sum()
+    faturamento_ontem = data[data['DATA_PEDIDO'].dt.date == ontem.date()]['VLTOTAL'].sum()
+    faturamento_semanal_atual = data[(data['DATA_PEDIDO'].dt.date >= semana_inicial.date()) & (data['DATA_PEDIDO'].dt.date <= hoje.date())]['VLTOTAL'].sum()
+    faturamento_semanal_passada = data[(data['DATA_PEDIDO'].dt.date >= semana_passada_inicial.date()) & (data['DATA_PEDIDO'].dt.date < semana_inicial.date())]['VLTOTAL'].sum()
+    return faturamento_hoje, faturamento_ontem, faturamento_semanal_atual, faturamento_semanal_passada
+
+
+def calcular_quantidade_pedidos(data, hoje, ontem, semana_inicial, semana_passada_inicial):
+    pedidos_hoje = data[data['DATA_PEDIDO'].dt.date == hoje.date()]['NUMPED'].nunique()
+    pedidos_ontem = data[data['DATA_PEDIDO'].dt.date == ontem.date()]['NUMPED'].nunique()
+    pedidos_semanal_atual = data[(data['DATA_PEDIDO'].dt.date >= semana_inicial.date()) & (data['DATA_PEDIDO'].dt.date <= hoje.date())]['NUMPED'].nunique()
+    pedidos_semanal_passada = data[(data['DATA_PEDIDO'].dt.date >= semana_passada_inicial.date()) & (data['DATA_PEDIDO'].dt.date < semana_inicial.date())]['NUMPED'].nunique()
+    return pedidos_hoje, pedidos_ontem, pedidos_semanal_atual, pedidos_semanal_passada
+
+
+def calcular_comparativos(data, hoje, mes_atual, ano_atual):
+    mes_anterior = mes_atual - 1 if mes_atual > 1 else 12
+    ano_anterior = ano_atual if mes_atual > 1 else ano_atual - 1
+    faturamento_mes_atual = data[(data['DATA_PEDIDO'].dt.month == mes_atual) & (data['DATA_PEDIDO'].dt.year == ano_atual)]['VLTOTAL'].sum()
+    pedidos_mes_atual = data[(data['DATA_PEDIDO'].dt.month == mes_atual) & (data['DATA_PEDIDO'].dt.year == ano_atual)]['NUMPED'].nunique()
+    faturamento_mes_anterior = data[(data['DATA_PEDIDO'].dt.month == mes_anterior) & (data['DATA_PEDIDO'].dt.year == ano_anterior)]['VLTOTAL'].sum()
+    pedidos_mes_anterior = data[(data['DATA_PEDIDO'].dt.month == mes_anterior) & (data['DATA_PEDIDO'].dt.year == ano_anterior)]['NUMPED'].nunique()
+    return faturamento_mes_atual, faturamento_mes_anterior, pedidos_mes_atual, pedidos_mes_anterior
+
+
+# Resumo dos cards pelas funções antigas, no formato de serie_diaria.resumo
+def resumo_legado(data, hoje):
+    hoje = datetime.combine(hoje, datetime.min.time())
+    ontem = hoje - timedelta(days=1)
+    semana_inicial = hoje - timedelta(days=hoje.weekday())
+    semana_passada_inicial = semana_inicial - timedelta(days=7)
+    faturamento = calcular_faturamento(data, hoje, ontem, semana_inicial, semana_passada_inicial)
+    pedidos = calcular_quantidade_pedidos(data, hoje, ontem, semana_inicial, semana_passada_inicial)
+    fat_mes, fat_mes_anterior, ped_mes, ped_mes_anterior = calcular_comparativos(data, hoje, hoje.month, hoje.year)
+    periodos = ['hoje', 'ontem', 'semana_atual', 'semana_passada']
+    resumo = {periodo: (faturamento[i], pedidos[i]) for i, periodo in enumerate(periodos)}
+    resumo['mes_atual'] = (fat_mes, ped_mes)
+    resumo['mes_anterior'] = (fat_mes_anterior, ped_mes_anterior)
+    return resumo
+
+
+# Linhas de PCPEDC como no ERP: data (com hora) e filial são do pedido, repetidas em todas as suas linhas
+def pcpedc(semente, pedidos=1500, dias=75):
+    rng = np.random.default_rng(semente)
+    linhas_por_pedido = rng.integers(1, 6, pedidos)
+    numped = np.repeat(np.arange(100000, 100000 + pedidos), linhas_por_pedido)
+    inicio = pd.Timestamp(HOJE - timedelta(days=dias - 1))
+    data_pedido = inicio + pd.to_timedelta(rng.integers(0, dias * 24 * 60, pedidos), unit="min")
+    filial = rng.choice(['1', '2'], pedidos)
+    n = len(numped)
+    data = pd.DataFrame({
+        'NUMPED': numped,
+        'DATA_PEDIDO': np.repeat(data_pedido.to_numpy(), linhas_por_pedido),
+        'CODFILIAL': np.repeat(filial, linhas_por_pedido),
+        'QT': rng.integers(1, 20, n).astype(float),
+        'PVENDA': rng.uniform(0.5, 300, n).round(2),
+    })
+    data['VLTOTAL'] = data['PVENDA'] * data['QT']
+    return data
+
+
+# Série montada como na página: carga inicial e depois só os dias a partir da carência
+def serie_de(data, corte):
+    serie = serie_diaria.SerieDiaria()
+    serie.atualizar(serie_diaria.agregar(data[data['DATA_PEDIDO'] < pd.Timestamp(corte)]))
+    desde = pd.Timestamp(serie.desde())
+    serie.atualizar(serie_diaria.agregar(data[data['DATA_PEDIDO'] >= desde]))
+    return serie
+
+
+def comparar(novo, legado):
+    assert novo.keys() == legado.keys()
+    for periodo, (faturamento, pedidos) in legado.items():
+        assert novo[periodo][0] == pytest.approx(faturamento, rel=1e-9), periodo
+        assert novo[periodo][1] == pedidos, periodo
+
+
+@pytest.mark.parametrize("semente", [1, 2, 3])
+def test_resumo_da_serie_igual_aos_calculos_antigos(semente):
+    data = pcpedc(semente)
+    serie = serie_de(data, HOJE - timedelta(days=2))
+    comparar(serie_diaria.resumo(serie, ['1', '2'], HOJE), resumo_legado(data, HOJE))
+
+
+def test_resumo_por_filial_igual_aos_calculos_antigos_da_filial():
+    data = pcpedc(4)
+    serie = serie_de(data, HOJE)
+    for filial in ['1', '2']:
+        comparar(serie_diaria.resumo(serie, [filial], HOJE), resumo_legado(data[data['CODFILIAL'] == filial], HOJE))
+
+
+# A função do banco devolve o mesmo formato do agregado local (tipos do esquema kpi_pcpedc_diario)
+def test_resultado_da_funcao_do_banco_igual_ao_agregado_local():
+    data = pcpedc(5)
+    local = serie_diaria.agregar(data)
+    rpc = esquemas.aplicar("kpi_pcpedc_diario", local.assign(DATA_PEDIDO=local['DATA_PEDIDO'].dt.strftime("%Y-%m-%d")))
+    for diario in (local, rpc):
+        serie = serie_diaria.SerieDiaria()
+        serie.atualizar(diario)
+        comparar(serie_diaria.resumo(serie, ['1', '2'], HOJE), resumo_legado(data, HOJE))
+
+
+# Pedidos somados de qualquer período e conjunto de filiais iguais ao nunique sobre as linhas do período
+# (vale porque data e filial são do pedido)
+@pytest.mark.parametrize("semente", [6, 7])
+def test_pedidos_somados_iguais_ao_nunique_do_periodo(semente):
+    data = pcpedc(semente)
+    serie = serie_de(data, HOJE - timedelta(days=10))
+    rng = np.random.default_rng(semente)
+    dias = pd.date_range(HOJE - timedelta(days=80), HOJE + timedelta(days=3)).date
+    for _ in range(200):
+        inicio, fim = sorted(rng.choice(dias, 2))
+        filiais = [filial for filial in ['1', '2', '3'] if rng.random() < 0.6] or ['1']
+        periodo = data[(data['DATA_PEDIDO'].dt.date >= inicio) & (data['DATA_PEDIDO'].dt.date <= fim)
+                       & data['CODFILIAL'].isin(filiais)]
+        somas = serie.somar(filiais, inicio, fim)
+        assert somas['PEDIDOS'] == periodo['NUMPED'].nunique(), (inicio, fim, filiais)
+        assert somas['VLTOTAL'] == pytest.approx(periodo['VLTOTAL'].sum(), rel=1e-9, abs=1e-6)
+
+
+# Sem a invariante, o pedido com linhas em dois dias é contado nos dois (o que o comentário da série documenta)
+def test_pedido_em_dois_dias_conta_uma_vez_por_dia():
+    data = pd.DataFrame({'NUMPED': [1, 1, 2], 'CODFILIAL': ['1', '1', '1'], 'VLTOTAL': [10.0, 5.0, 1.0],
+                         'DATA_PEDIDO': pd.to_datetime(['2025-05-12', '2025-05-13', '2025-05-13'])})
+    serie = serie_diaria.SerieDiaria()
+    serie.atualizar(serie_diaria.agregar(data))
+    assert data['NUMPED'].nunique() == 2
+    assert serie.somar(['1'], date(2025, 5, 12), date(2025, 5, 13))['PEDIDOS'] == 3
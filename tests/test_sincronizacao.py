@@ -0,0 +1,179 @@
+import re
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import agendador
+import dados
+import gerenciador_cache
+import sincronizacao
+from Pedidos_Venda import CONSULTA_PCPEDI
+from test_consultas import especificacao
+
+# PCPEDI com a recarga completa espaçada (a página relê sempre), para exercitar a busca incremental
+INCREMENTAL = {**CONSULTA_PCPEDI, "ressincronizar": sincronizacao.RESSINCRONIZAR_SEGUNDOS}
+
+
+# Tabela PCPEDI falsa: filtros da especificação (gte/lte na data, gt na marca) e ordenação pela chave
+class PcpediFalsa:
+    def __init__(self):
+        self.linhas = []
+        self.consultas = []
+
+    def inserir(self, numped, codprod, created_at, qt=1):
+        self.linhas.append({
+            "id": max((linha["id"] for linha in self.linhas), default=0) + 1, "created_at": created_at, "NUMPED": numped, "CODPROD": codprod,
+            "DATA": "2025-05-13", "QT": qt, "POSICAO": "L",
+        })
+
+    def _filtrar(self, filters, chave):
+        linhas = list(self.linhas)
+        for coluna, operador, valor in filters:
+            comparar = {"gt": lambda a, b: a > b, "gte": lambda a, b: a >= b, "lte": lambda a, b: a <= b}[operador]
+            linhas = [linha for linha in linhas if comparar(linha[coluna], valor)]
+        return sorted(linhas, key=lambda linha: linha[chave])
+
+    def fetch_spec(self, spec, data_inicial=None, data_final=None):
+        columns, filtros, order = dados.compilar(spec, data_inicial, data_final)
+        return [dict(linha) for linha in self._filtrar(filtros, order)]
+
+    def fetch_paralelo(self, table, columns="*", filters=None, chave="id", projeto="principal", **_):
+        self.consultas.append((list(filters), chave))
+        return [dict(linha) for linha in self._filtrar(filters, chave)]
+
+
+# Relógio do processo controlado pelo teste (time.monotonic usado pela sincronização)
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(mocker):
+    relogio = Relogio()
+    mocker.patch.object(sincronizacao.time, "monotonic", side_effect=lambda: relogio.agora)
+    return relogio
+
+
+@pytest.fixture
+def pcpedi(mocker, relogio):
+    gerenciador_cache.limpar(sincronizacao.NAMESPACE)
+    falsa = PcpediFalsa()
+    mocker.patch.object(dados, "fetch_spec", side_effect=falsa.fetch_spec)
+    mocker.patch.object(dados, "fetch_paralelo", side_effect=falsa.fetch_paralelo)
+    yield falsa
+    gerenciador_cache.limpar(sincronizacao.NAMESPACE)
+
+
+def test_marca_do_pcpedi_e_o_id_unico():
+    assert CONSULTA_PCPEDI["marca"] == "id"
+
+
+def test_linhas_com_o_mesmo_created_at_da_ultima_marca_nao_se_perdem(pcpedi):
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00")
+    pcpedi.inserir(1, 11, "2025-05-13T10:00:05")
+    assert len(sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")) == 2
+
+    # O ERP grava mais itens no mesmo segundo da última linha já sincronizada
+    pcpedi.inserir(2, 10, "2025-05-13T10:00:05")
+    pcpedi.inserir(2, 11, "2025-05-13T10:00:05")
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+
+    assert sorted(zip(df["NUMPED"], df["CODPROD"])) == [(1, 10), (1, 11), (2, 10), (2, 11)]
+    filtros, chave = pcpedi.consultas[-1]
+    assert ("id", "gt", 2) in filtros and chave == "id"
+
+
+def test_item_regravado_substitui_o_antigo_pela_chave_de_negocio(pcpedi):
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00", qt=1)
+    sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00", qt=5)
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    assert df[["NUMPED", "CODPROD", "QT"]].values.tolist() == [[1, 10, 5]]
+
+
+def test_sem_linhas_novas_o_frame_nao_muda(pcpedi):
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00")
+    primeiro = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    segundo = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    pd.testing.assert_frame_equal(primeiro, segundo)
+
+
+def test_linha_alterada_no_lugar_aparece_na_ressincronizacao(pcpedi, relogio):
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00")
+    pcpedi.inserir(1, 11, "2025-05-13T10:00:00")
+    sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+
+    # O ERP fatura o pedido: POSICAO muda nas mesmas linhas (mesmo id, nenhuma linha nova)
+    for linha in pcpedi.linhas:
+        linha["POSICAO"] = "F"
+    relogio.avancar(INCREMENTAL["ressincronizar"] - 1)
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    assert df["POSICAO"].tolist() == ["L", "L"]  # dentro do intervalo só as inserções são buscadas
+
+    relogio.avancar(1)
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    assert df["POSICAO"].tolist() == ["F", "F"]
+
+
+def test_linha_excluida_some_na_ressincronizacao(pcpedi, relogio):
+    for codprod in (10, 11, 12):
+        pcpedi.inserir(1, codprod, "2025-05-13T10:00:00")
+    sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+
+    del pcpedi.linhas[1]
+    pcpedi.inserir(2, 10, "2025-05-13T10:05:00")
+    relogio.avancar(INCREMENTAL["ressincronizar"])
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    assert sorted(zip(df["NUMPED"], df["CODPROD"])) == [(1, 10), (1, 12), (2, 10)]
+
+    # Depois da recarga a marca continua valendo para as inserções seguintes
+    pcpedi.inserir(2, 11, "2025-05-13T10:06:00")
+    df = sincronizacao.sincronizar(INCREMENTAL, "2025-05-13", "2025-05-13")
+    assert len(df) == 4
+    assert pcpedi.consultas[-1][0][-1] == ("id", "gt", 4)
+
+
+def test_ressincronizar_zero_rele_a_cada_chamada(pcpedi):
+    assert CONSULTA_PCPEDI["ressincronizar"] == 0
+    pcpedi.inserir(1, 10, "2025-05-13T10:00:00", qt=1)
+    sincronizacao.sincronizar(CONSULTA_PCPEDI, "2025-05-13", "2025-05-13")
+
+    pcpedi.linhas[0]["QT"] = 7
+    df = sincronizacao.sincronizar(CONSULTA_PCPEDI, "2025-05-13", "2025-05-13")
+    assert df["QT"].tolist() == [7]
+    assert pcpedi.consultas == []  # nenhuma busca incremental
+
+
+# Tabelas das pré-cargas: cada execução do agendador traz as alterações (a recarga completa vence antes
+# do intervalo da tarefa)
+PRE_CARGAS = {
+    "separacao": [("Pedidos.py", "SUPABASE_TABLES", 0), ("Pedidos.py", "SUPABASE_TABLES", 1)],
+    "pedidos_venda": [("Pedidos_Venda.py", "CONSULTA_PCPEDI", None)],
+    "estoque": [("Estoque.py", "SUPABASE_CONFIG", "estoque")],
+}
+
+
+@pytest.mark.parametrize("tarefa", list(PRE_CARGAS))
+def test_pre_cargas_trazem_linhas_alteradas(tarefa):
+    intervalo = agendador.TAREFAS[tarefa]["intervalo"] - agendador.TAREFAS[tarefa].get("jitter", 0)
+    for pagina in PRE_CARGAS[tarefa]:
+        spec, _ = especificacao(*pagina)
+        assert spec.get("ressincronizar", sincronizacao.RESSINCRONIZAR_SEGUNDOS) <= intervalo, pagina
+
+
+# A pré-carga de PCPEDI aquece a mesma chave que a página pede ao abrir (o período padrão é o dia atual)
+def test_pre_carga_de_pcpedi_usa_o_periodo_padrao_da_pagina(mocker):
+    import Pedidos_Venda
+    recarregar = mocker.patch.object(Pedidos_Venda.fetch_pedidos, "recarregar", return_value=True)
+    agendador.TAREFAS["pedidos_venda"]["funcao"]()
+    recarregar.assert_called_once_with(date.today(), date.today())
+
+    _, codigo = especificacao("Pedidos_Venda.py", "CONSULTA_PCPEDI", None)
+    padroes = re.findall(r'st\.date_input\("Data (?:Inicial|Final)", ([^,]+),', codigo)
+    assert padroes == ["date.today()", "date.today()"]
@@ -0,0 +1,57 @@
+import pandas as pd
+
+import agregados
+
+# Vendas diárias por produto de VWSOMELIER (agregado diário incremental, ver agregados): Produto lê os
+# dias do seu período e Estoque e Fornecedor leem a quantidade vendida por produto como soma móvel.
+# CODOPER fica no grão porque Produto só mostra pedidos de venda ('S') e as páginas de estoque somam
+# todas as operações.
+
+# Consulta de VWSOMELIER compartilhada pelas páginas (sem filtro de operação, ver acima)
+CONSULTA_VWSOMELIER = {
+    "table": "VWSOMELIER",
+    "columns": ['DESCRICAO_1', 'CODPROD', 'DATA', 'QT', 'PVENDA', 'VLCUSTOFIN', 'CODOPER'],
+    "date_column": "DATA",
+    "order": "id",
+    "marca": "id",
+    "chave_negocio": ['id'],
+}
+
+# Grão do agregado
+CHAVES = ['DIA', 'CODPROD', 'DESCRICAO_1', 'CODOPER']
+
+# Métricas: quantidade (QT), faturamento (PVENDA), custo (VLCUSTOFIN) e linhas de pedido
+METRICAS = ['QT', 'VALOR', 'CUSTO', 'LINHAS']
+
+
+# Função de agregação das linhas de VWSOMELIER por dia e produto
+def agregar(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=CHAVES + METRICAS)
+    linhas = pd.DataFrame({
+        'DIA': df['DATA'].dt.normalize(),
+        'CODPROD': df['CODPROD'],
+        'DESCRICAO_1': df['DESCRICAO_1'].astype(object).fillna('').astype(str).str.strip(),
+        'CODOPER': df['CODOPER'].astype(object).fillna(''),
+        'QT': df['QT'],
+        'VALOR': df['PVENDA'],
+        'CUSTO': df['VLCUSTOFIN'],
+    })
+    return linhas.groupby(CHAVES, sort=False, observed=True).agg(
+        QT=('QT', 'sum'),
+        VALOR=('VALOR', 'sum'),
+        CUSTO=('CUSTO', 'sum'),
+        LINHAS=('QT', 'size'),
+    ).reset_index()
+
+
+# Função para ler as vendas diárias por produto do período (uma linha por dia, produto e operação)
+def carregar(data_inicial, data_final) -> pd.DataFrame:
+    return agregados.carregar(CONSULTA_VWSOMELIER, agregar, data_inicial, data_final)
+
+
+# Função para obter a quantidade vendida por produto (CODPROD, QT) nos últimos `dias` dias até hoje,
+# ou em todo o histórico com dias=None
+def vendido(dias: int = None) -> pd.DataFrame:
+    total = agregados.somar_janela(CONSULTA_VWSOMELIER, agregar, ['CODPROD'], METRICAS, dias)
+    return total[['CODPROD', 'QT']]